@@ -0,0 +1,246 @@
+"""
+Copyright 2026 Rob Weber
+This file is part of ha-betabrite-sign
+omni-epd is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import tempfile
+import time
+import tracemalloc
+import yaml
+from datetime import datetime
+from termcolor import colored
+from lib import constants
+from lib.simulator import SignSimulator, get_timings
+
+# templates for each complexity level
+MQTT_TEMPLATES = {1: "{{ value }}",
+                  2: "{% if value == 'on' %}{{ value | upper }}{% else %}{{ value | color('red') }}{% endif %}",
+                  3: "{% for i in range(3) %}{{ value | replace('_', ' ') }} {% endfor %}{{ value | length }} "
+                     "{{ value | color('red', value == 'on', 'green') }}"}
+JSON_TEMPLATES = {1: "{{ value.state }}",
+                  2: "{% if value.state == 'on' %}{{ value.state }} {{ value.level }}%{% else %}off{% endif %}",
+                  3: "{% for k in value %}{{ k }}={{ value[k] }} {% endfor %}{{ value.level | int * 2 }}"}
+# $1 and $2 are replaced with the names of the variables to depend on
+DYNAMIC_TEMPLATES = {1: "{{ get_payload('$1') }} {{ get_payload('$2') }}",
+                     2: "{% if is_payload('$1', 'on') %}{{ get_payload('$2') }}{% else %}none{% endif %}",
+                     3: "{{ get_payload('$1') | upper }} {{ get_payload_attr('$2', 'state') }} {{ now().strftime('%H:%M') }}"}
+
+# max Text objects to create, sign labels are letters so keep these from running into string labels
+MAX_MESSAGES = 24
+
+
+class SignBenchmark:
+    """Builds a synthetic layout and measures the main update paths against a DebugInterface"""
+    variables = 100
+    queues = 5
+    complexity = 2
+    iterations = 1000
+
+    __layout = None
+    __sim = None
+    __random = None
+    __results = None
+
+    def __init__(self, variables, queues, complexity, iterations, seed):
+        self.variables = variables
+        self.queues = queues
+        self.complexity = complexity
+        self.iterations = iterations
+
+        self.__random = random.Random(seed)
+        self.__results = {}
+
+    def create_layout(self):
+        """generate a layout file, variables are split between plain MQTT, JSON MQTT and dynamic
+
+        :returns: path to the temporary layout file
+        """
+        variables = {}
+        names = []
+        for i in range(0, self.variables):
+            if(i % 3 == 0):
+                name = f"mqtt_{i}"
+                variables[name] = {"type": "mqtt", "topic": f"bench/{name}/state", "template": MQTT_TEMPLATES[self.complexity]}
+            elif(i % 3 == 1):
+                name = f"json_{i}"
+                variables[name] = {"type": "mqtt", "topic": f"bench/{name}/state", "template": JSON_TEMPLATES[self.complexity]}
+            else:
+                # depend on the two variables before this one
+                name = f"dynamic_{i}"
+                template = DYNAMIC_TEMPLATES[self.complexity].replace('$1', names[-2]).replace('$2', names[-1])
+                variables[name] = {"type": "dynamic", "template": template}
+
+            names.append(name)
+
+        # spread the variables over the messages in each queue
+        per_queue = max(1, min(4, MAX_MESSAGES // self.queues))
+        chunks = [names[i::self.queues * per_queue] for i in range(0, self.queues * per_queue)]
+
+        display = {}
+        for q in range(0, self.queues):
+            queue_name = "main" if q == 0 else f"queue_{q}"
+            display[queue_name] = {"queue": [{"message": c, "mode": "hold"} for c in chunks[q * per_queue:(q + 1) * per_queue] if len(c) > 0]}
+
+            if(q > 0):
+                display[queue_name]['active_template'] = f"{{{{ is_payload('{names[0]}', '{queue_name}') }}}}"
+
+        file, path = tempfile.mkstemp(suffix=".yaml", text=True)
+        with os.fdopen(file, 'w') as f:
+            yaml.safe_dump({"variables": variables, "display": display}, f)
+
+        self.__layout = path
+        return path
+
+    def run(self):
+        """run each benchmark, tracemalloc slows everything down so memory used by
+        the loaded layout is measured separately from the timings
+
+        :returns: dict of results
+        """
+        try:
+            self.__bench_memory()
+            self.__bench_startup()
+            self.__bench_render()
+            self.__bench_dispatch()
+            self.__bench_tick()
+
+            self.__sim.stop()
+            self.__results['sign'] = self.__sim.get_stats()
+            self.__results['memory']['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        finally:
+            os.remove(self.__layout)
+
+        return {"version": constants.PROJECT_VERSION, "python": platform.python_version(),
+                "date": datetime.now().isoformat(timespec='seconds'),
+                "params": {"variables": self.variables, "queues": self.queues, "complexity": self.complexity,
+                           "iterations": self.iterations},
+                "results": self.__results}
+
+    def __random_payload(self, name):
+        if(name.startswith('json')):
+            return json.dumps({"state": self.__random.choice(['on', 'off']), "level": self.__random.randint(0, 100)})
+        else:
+            return self.__random.choice(['on', 'off', 'unknown', 'open_closed'])
+
+    def __bench_memory(self):
+        """memory allocated to load and start a layout"""
+        tracemalloc.start()
+
+        sim = SignSimulator(self.__layout)
+        sim.startup()
+        current, peak = tracemalloc.get_traced_memory()
+
+        tracemalloc.stop()
+        sim.stop()
+
+        self.__results['memory'] = {"layout_kb": round(current / 1024, 1), "peak_kb": round(peak / 1024, 1)}
+
+    def __bench_startup(self):
+        """time loading the layout, MessageManager.startup() and loading the templates"""
+        start = time.perf_counter()
+        self.__sim = SignSimulator(self.__layout)
+        loaded = time.perf_counter()
+        self.__sim.startup()
+        done = time.perf_counter()
+
+        self.__results['startup'] = {"load_ms": round((loaded - start) * 1000, 2), "startup_ms": round((done - loaded) * 1000, 2)}
+
+    def __bench_render(self):
+        """render every jinja variable over and over, PayloadManager.render_variable()"""
+        pm = self.__sim.payload_manager
+        jinjaVars = [v for v in self.__sim.manager.get_variables_by_filter(constants.JINJA_CATEGORY)
+                     if v.get_name().startswith(('mqtt_', 'json_', 'dynamic_'))]
+
+        for v in jinjaVars:
+            if(v.get_type() == 'mqtt'):
+                pm.set_payload(v.get_name(), json.loads(self.__random_payload(v.get_name())) if v.get_name().startswith('json') else 'on')
+
+        renders = 0
+        start = time.perf_counter()
+        while(renders < self.iterations):
+            for v in jinjaVars:
+                pm.render_variable(v)
+                renders = renders + 1
+
+        elapsed = time.perf_counter() - start
+        self.__results['render'] = {"renders": renders, "renders_per_sec": round(renders / elapsed, 1),
+                                    "mean_us": round(elapsed / renders * 1e6, 2)}
+
+    def __bench_dispatch(self):
+        """send messages to random topics, the same path as mqtt_on_message()"""
+        mqttVars = self.__sim.manager.get_variables_by_filter(constants.MQTT_CATEGORY, lambda v: v.get_name().startswith(('mqtt_', 'json_')))
+
+        samples = []
+        for i in range(0, self.iterations):
+            aVar = self.__random.choice(mqttVars)
+            payload = self.__random_payload(aVar.get_name())
+
+            start = time.perf_counter()
+            self.__sim.on_message(aVar.get_topic(), payload)
+            samples.append(time.perf_counter() - start)
+
+        self.__results['dispatch'] = get_timings(samples)
+
+    def __bench_tick(self):
+        """run the main loop tick with all local polling variables due, the same as poll() without network variables"""
+        pollingVars = self.__sim.manager.get_variables_by_filter(constants.POLLING_CATEGORY, lambda v: v.get_type() in ['date', 'dynamic'])
+
+        samples = []
+        for i in range(0, max(1, self.iterations // 10)):
+            start = time.perf_counter()
+            self.__sim.tick(pollingVars)
+            samples.append(time.perf_counter() - start)
+
+        self.__results['tick'] = get_timings(samples)
+
+
+parser = argparse.ArgumentParser(description=f"{constants.PROJECT_NAME} - Benchmark")
+parser.add_argument('-n', '--variables', type=int, default=100,
+                    help="Number of variables in the generated layout, default is %(default)s")
+parser.add_argument('-q', '--queues', type=int, default=5,
+                    help="Number of message queues in the generated layout, default is %(default)s")
+parser.add_argument('-t', '--complexity', type=int, choices=[1, 2, 3], default=2,
+                    help="Template complexity, 1 is a simple value and 3 uses loops and filters, default is %(default)s")
+parser.add_argument('-i', '--iterations', type=int, default=1000,
+                    help="Number of renders and messages to time, default is %(default)s")
+parser.add_argument('-s', '--seed', type=int, default=1,
+                    help="Random seed, use the same seed to compare runs, default is %(default)s")
+parser.add_argument('-o', '--output', required=False,
+                    help="Path to write the JSON results to, printed if missing")
+
+args = parser.parse_args()
+
+# only show warnings, debug logging would skew the results
+logging.basicConfig(datefmt='%m/%d %H:%M',
+                    format="%(message)s",
+                    level=getattr(logging, 'WARNING'))
+
+benchmark = SignBenchmark(max(args.variables, 3), max(args.queues, 1), args.complexity, args.iterations, args.seed)
+benchmark.create_layout()
+
+results = json.dumps(benchmark.run(), indent=2)
+
+if(args.output):
+    with open(args.output, 'w') as f:
+        f.write(results)
+
+    print(colored(f"Results written to {args.output}", 'green'))
+else:
+    print(results)
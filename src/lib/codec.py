@@ -0,0 +1,80 @@
+"""
+Copyright 2026 Rob Weber
+This file is part of ha-betabrite-sign
+omni-epd is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+import logging
+
+# use orjson if it is installed, it is much faster for large payloads
+try:
+    import orjson
+    _loads = orjson.loads
+    _errors = (orjson.JSONDecodeError, )
+except ImportError:
+    _loads = json.loads
+    _errors = (json.JSONDecodeError, )
+
+# payload formats
+AUTO = 'auto'  # JSON if the payload looks like JSON, otherwise text
+JSON = 'json'
+NUMBER = 'number'
+TEXT = 'text'
+PAYLOAD_FORMATS = [AUTO, JSON, NUMBER, TEXT]
+
+# first characters of a JSON document, used to skip parsing payloads that can't be JSON
+JSON_START = frozenset('{["-0123456789tfnNI')
+
+
+def decode(payload, format=AUTO):
+    """decode a payload once, based on the expected format
+
+    :param payload: the payload string
+    :param format: one of the PAYLOAD_FORMATS
+
+    :returns: the decoded payload, the original string if it can't be decoded
+    """
+    if(format == TEXT):
+        return payload
+
+    if(format == NUMBER):
+        return _decode_number(payload)
+
+    if(format == AUTO):
+        # skip the parse for anything that can't be JSON
+        check = payload.lstrip()
+        if(len(check) == 0 or check[0] not in JSON_START):
+            return payload
+
+    try:
+        return _loads(payload)
+    except _errors:
+        if(format == JSON):
+            logging.warning(f"Payload is not valid JSON: {payload[:50]}")
+
+    return payload
+
+
+def _decode_number(payload):
+    """:returns: the payload as an int or float, the original string if it isn't a number"""
+    try:
+        return int(payload)
+    except ValueError:
+        pass
+
+    try:
+        return float(payload)
+    except ValueError:
+        logging.warning(f"Payload is not a number: {payload[:50]}")
+
+    return payload
@@ -14,11 +14,9 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 import alphasign
-import json
 import logging
 import re
 import socket
-from json.decoder import JSONDecodeError
 
 # project name and current version
 PROJECT_NAME = "Home Assistant Betabrite Sign"
@@ -32,17 +30,23 @@ MQTT_PUSH_CATEGORY = "mqtt_push"
 JINJA_CATEGORY = 'jinja'
 STATEFUL_CATEGORY = 'stateful'
 CATEGORY_DEFAULTS = {ALPHASIGN_CATEGORY: {}, POLLING_CATEGORY: {"cron": "*/5 * * * *"},
-                     MQTT_CATEGORY: {"qos": 0}, JINJA_CATEGORY: {'update_template': "True", "template": "{{ value }}"},
+                     MQTT_CATEGORY: {"qos": 0}, JINJA_CATEGORY: {'update_template': "True", "template": "{{ value }}", "payload_format": "auto"},
                      MQTT_PUSH_CATEGORY: {"should_update_topic_template": "False", "update_topic_template": "", "retain": True},
                      STATEFUL_CATEGORY: {"states": {}}}
 
+# defaults for the optional settings section of the layout file
+SETTINGS_DEFAULTS = {"poll_workers": 4}
+
 # MQTT topics for state and commands
 MQTT_STATUS = "betabrite/sign/status"
 MQTT_ATTRIBUTES = "betabrite/sign/attributes"
 MQTT_SWITCH = "betabrite/sign/switch"
 MQTT_AVAILABLE = "betabrite/sign/available"
 MQTT_COMMAND = "betabrite/sign/command"
+MQTT_COMMAND_RESULT = "betabrite/sign/command/result"
+MQTT_BULK = "betabrite/sign/bulk"
 MQTT_CURRENT_TEXT = "betabrite/sign/current_text"
+MQTT_METRICS = "betabrite/sign/metrics"
 MQTT_NEW_TEXT = "betabrite/sign/new_text"
 MQTT_TIMER_STATUS = "betabrite/timer_switch/status"
 MQTT_TIMER_COMMAND = "betabrite/timer_switch/command"
@@ -50,6 +54,9 @@ MQTT_TIMER_TEXT = "betabrite/timer/current_text"
 MQTT_TIMER_NEW_TEXT = "betabrite/timer/new_text"
 MQTT_TIMER_EVENT = "betabrite/timer/event"
 
+# profiles started from the command topic are saved here
+PROFILE_DIR = "data/profiles"
+
 # MQTT Device types
 MQTT_DISCOVERY_LIGHT_CLASS = "light"
 MQTT_DISCOVERY_SWITCH_CLASS = "switch"
@@ -92,20 +99,6 @@ ALPHA_FONTS = {"five_high_std": alphasign.charsets.FIVE_HIGH_STD, "five_stroke":
                "seven_fancy_wide": alphasign.charsets.SEVEN_FANCY_WIDE, "wide_stroke_five": alphasign.charsets.WIDE_STROKE_FIVE}
 
 
-def is_json(str):
-    """Checks if a string can be decoded into a JSON object"""
-    result = False
-
-    try:
-        json.loads(str)
-        result = True
-    except JSONDecodeError:
-        # do nothing
-        pass
-
-    return result
-
-
 def strip_control(str):
     """strips Alphasign control characters from a string so it can be logged properly
     :param str: the string to check for Alphasign control characters
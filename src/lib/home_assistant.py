@@ -13,8 +13,10 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-import requests
 import json
+import re
+import uuid
+from .http_client import HttpClient
 
 
 class HomeAssistant:
@@ -24,30 +26,39 @@ class HomeAssistant:
     """
     url = None
     token = None
+    __client = None
+    __headers = None
 
-    def __init__(self, url, token):
+    def __init__(self, url, token, client=None):
         """
         :param url: the url to an HA instance starting with http:// or http://
         :param token: a long lived access token created in HA
+        :param client: the HttpClient to use for requests, a new one is created if None
         """
         self.url = url
         self.token = token
+        self.__client = client if client is not None else HttpClient()
 
-    def _make_request(self, endpoint, data=None):
-        """makes the request to the given HA endpoint
-
-        :returns: the HTTP response HTTP object
-        """
-        headers = {
+        # headers are the same for every request
+        self.__headers = {
             'Authorization': 'Bearer %s' % self.token,
             'content-type': 'application/json',
         }
 
+    def _make_request(self, endpoint, data=None, timeout=None):
+        """makes the request to the given HA endpoint
+
+        :param endpoint: the API endpoint
+        :param data: dict to POST as JSON, if None a GET request is made
+        :param timeout: seconds to wait for the request, None waits forever
+
+        :returns: the HTTP response HTTP object
+        """
         # if no POST data given, do a GET request
         if(data is None):
-            response = requests.get('%s%s' % (self.url, endpoint), headers=headers)
+            response = self.__client.get('%s%s' % (self.url, endpoint), headers=self.__headers, timeout=timeout)
         else:
-            response = requests.post('%s%s' % (self.url, endpoint), data=json.dumps(data), headers=headers)
+            response = self.__client.post('%s%s' % (self.url, endpoint), data=json.dumps(data), headers=self.__headers, timeout=timeout)
 
         return response
 
@@ -62,15 +73,16 @@ class HomeAssistant:
 
         return json.loads(response.text)
 
-    def render_template(self, template):
+    def render_template(self, template, timeout=None):
         """sends a template string to Home Assistant to have it rendered
 
         :param template: the string as a valid HA template
+        :param timeout: seconds to wait for Home Assistant to respond, None waits forever
 
         :returns: the response from Home Assistant as a string
         """
         result = None
-        response = self._make_request('/api/template', {'template': template})
+        response = self._make_request('/api/template', {'template': template}, timeout)
 
         if(response.status_code == 200):
             # successful template rendering
@@ -81,6 +93,58 @@ class HomeAssistant:
 
         return result
 
+    def render_templates(self, templates, timeout=None):
+        """renders multiple templates with a single request to Home Assistant. The templates
+        are combined into one, separated by unique markers, and the result split back apart. If
+        the combined template can't be rendered each template is rendered on its own so an error
+        in one template doesn't affect the others.
+
+        :param templates: dict of name: template string
+        :param timeout: seconds to wait for Home Assistant to respond, None waits forever
+
+        :returns: dict of name: rendered result, or a TemplateSyntaxError if that template could not be rendered
+        """
+        result = {}
+        names = list(templates.keys())
+
+        if(len(names) == 1):
+            # nothing to combine
+            return self.__render_each(templates, timeout)
+
+        # each template is rendered in its own scope so variables set in one can't leak into another
+        marker = uuid.uuid4().hex
+        combined = ''.join([f"[[{marker}:{i}]]{{% with %}}{templates[n]}{{% endwith %}}" for i, n in enumerate(names)])
+
+        try:
+            parts = re.split(r"\[\[%s:(\d+)\]\]" % marker, self.render_template(combined, timeout))
+
+            # parts are: leading text, index, result, index, result...
+            for i in range(1, len(parts) - 1, 2):
+                result[names[int(parts[i])]] = parts[i + 1]
+
+            if(len(result) != len(names)):
+                raise TemplateSyntaxError("batched template results could not be split")
+        except TemplateSyntaxError:
+            # find the template(s) with the problem
+            result = self.__render_each(templates, timeout)
+
+        return result
+
+    def __render_each(self, templates, timeout):
+        """render each template with its own request
+
+        :returns: dict of name: rendered result or TemplateSyntaxError
+        """
+        result = {}
+
+        for name, template in templates.items():
+            try:
+                result[name] = self.render_template(template, timeout)
+            except TemplateSyntaxError as ex:
+                result[name] = ex
+
+        return result
+
 
 class TemplateSyntaxError(Exception):
     """Exception to catch when an HA templated message has incorrect syntax
@@ -0,0 +1,156 @@
+"""
+Copyright 2026 Rob Weber
+This file is part of ha-betabrite-sign
+omni-epd is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+import logging
+import threading
+import websocket
+
+
+class HomeAssistantStream:
+    """Keeps a WebSocket connection open to Home Assistant and subscribes to
+    each template using the render_template command. Home Assistant re-renders the template
+    and sends the result whenever an entity used in the template changes.
+    https://developers.home-assistant.io/docs/api/websocket
+
+    If the connection drops it is retried after a delay, the on_connection callback can
+    be used to fall back to polling while disconnected.
+
+    Home Assistant parses rendered results into numbers, lists, and dicts before sending them. Each
+    template is prefixed with TEXT_MARKER so the result can't be parsed and arrives as the same
+    text the /api/template endpoint returns when polling.
+    """
+    TEXT_MARKER = "[[text]]"  # not a valid Python literal, so Home Assistant leaves the result as text
+
+    url = None
+    token = None
+    reconnect_delay = 10
+
+    __templates = None
+    __on_update = None
+    __on_connection = None
+    __subscriptions = None
+    __socket = None
+    __thread = None
+    __running = False
+    __connected = False
+    __stop_event = None
+
+    def __init__(self, url, token, templates, on_update, on_connection=None, reconnect_delay=10):
+        """
+        :param url: the url to an HA instance starting with http:// or https://
+        :param token: a long lived access token created in HA
+        :param templates: dict of name: template string to subscribe to
+        :param on_update: function called with (name, result) when a template is rendered
+        :param on_connection: optional function called with True/False when the connection opens or closes
+        :param reconnect_delay: seconds to wait before reconnecting
+        """
+        # convert http(s):// to ws(s)://
+        self.url = f"ws{url[4:].rstrip('/')}/api/websocket"
+        self.token = token
+        self.reconnect_delay = reconnect_delay
+
+        self.__templates = templates
+        self.__on_update = on_update
+        self.__on_connection = on_connection
+        self.__subscriptions = {}
+        self.__stop_event = threading.Event()
+
+    def start(self):
+        """start the connection thread"""
+        self.__running = True
+        self.__thread = threading.Thread(target=self.__run, name="HomeAssistantStream", daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """close the connection and stop the connection thread"""
+        self.__running = False
+        self.__stop_event.set()
+
+        if(self.__socket is not None):
+            self.__socket.close()
+
+    def is_connected(self):
+        """:returns: True if connected and authenticated"""
+        return self.__connected
+
+    def __run(self):
+        """connection thread, reconnects until stopped"""
+        while(self.__running):
+            self.__socket = websocket.WebSocketApp(self.url, on_message=self.__message, on_close=self.__close,
+                                                   on_error=self.__error)
+            self.__socket.run_forever()
+
+            if(self.__running):
+                logging.info(f"Home Assistant stream disconnected, reconnecting in {self.reconnect_delay} seconds")
+                self.__stop_event.wait(self.reconnect_delay)
+
+    def __set_connected(self, connected):
+        if(self.__connected != connected):
+            self.__connected = connected
+
+            if(self.__on_connection is not None):
+                self.__on_connection(connected)
+
+    def __send(self, ws, message):
+        ws.send(json.dumps(message))
+
+    def __message(self, ws, message):
+        """handle messages from Home Assistant"""
+        data = json.loads(message)
+
+        if(data['type'] == 'auth_required'):
+            self.__send(ws, {"type": "auth", "access_token": self.token})
+        elif(data['type'] == 'auth_ok'):
+            # subscribe to each template, message ids must be increasing
+            self.__subscriptions = {}
+            for i, name in enumerate(self.__templates.keys(), start=1):
+                self.__subscriptions[i] = name
+                self.__send(ws, {"id": i, "type": "render_template", "template": f"{self.TEXT_MARKER}{self.__templates[name]}"})
+
+            logging.info(f"Home Assistant stream connected, subscribed to {len(self.__subscriptions)} templates")
+            self.__set_connected(True)
+        elif(data['type'] == 'auth_invalid'):
+            logging.error(f"Home Assistant stream authentication failed: {data.get('message')}")
+            ws.close()
+        elif(data['type'] == 'result' and not data['success']):
+            name = self.__subscriptions.get(data['id'])
+            logging.error(f"Home Assistant stream can't render {name}: {data['error']['message']}")
+        elif(data['type'] == 'event' and data['id'] in self.__subscriptions):
+            event = data['event']
+
+            if('result' in event):
+                self.__on_update(self.__subscriptions[data['id']], self.__get_text(event['result']))
+            elif('error' in event):
+                logging.error(f"Home Assistant stream can't render {self.__subscriptions[data['id']]}: {event['error']}")
+
+    def __get_text(self, result):
+        """get the rendered text from a render_template result, without the marker
+
+        :param result: the result sent by Home Assistant
+
+        :returns: the result as text
+        """
+        if(isinstance(result, str) and result.startswith(self.TEXT_MARKER)):
+            return result[len(self.TEXT_MARKER):]
+
+        # parsed anyway, convert it back to text the same way Home Assistant would show it
+        return json.dumps(result) if isinstance(result, (dict, list)) else str(result)
+
+    def __error(self, ws, error):
+        logging.error(f"Home Assistant stream error: {error}")
+
+    def __close(self, ws, status_code, message):
+        self.__set_connected(False)
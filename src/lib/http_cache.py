@@ -0,0 +1,108 @@
+"""
+Copyright 2026 Rob Weber
+This file is part of ha-betabrite-sign
+omni-epd is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import re
+import time
+
+# status code when the server says the resource has not changed
+NOT_MODIFIED = 304
+
+
+class HttpCache:
+    """Validation cache for a single URL. Keeps the ETag, Last-Modified and
+    Cache-Control max-age values from the last response so the next request can be skipped
+    while the response is still fresh, or made conditional once it is stale. Only the
+    validators are stored, the caller already has the last result.
+    """
+    __etag = None
+    __last_modified = None
+    __expires = 0
+
+    hits = 0  # polls skipped because the last response is still fresh
+    not_modified = 0  # requests answered with 304 Not Modified
+    misses = 0  # requests that returned a full response
+
+    def is_fresh(self):
+        """check if the last response is within its max-age, counts as a hit if it is
+
+        :returns: True if no request needs to be made
+        """
+        result = time.time() < self.__expires
+
+        if(result):
+            self.hits = self.hits + 1
+
+        return result
+
+    def get_headers(self):
+        """:returns: dict of conditional request headers for the stored validators"""
+        result = {}
+
+        if(self.__etag is not None):
+            result['If-None-Match'] = self.__etag
+
+        if(self.__last_modified is not None):
+            result['If-Modified-Since'] = self.__last_modified
+
+        return result
+
+    def update(self, response):
+        """store the validators from a response
+
+        :param response: the requests Response object
+
+        :returns: True if the response was 304 Not Modified, meaning the last result is still current
+        """
+        result = response.status_code == NOT_MODIFIED
+
+        if(result):
+            self.not_modified = self.not_modified + 1
+            self.__etag = response.headers.get('ETag', self.__etag)
+        elif(response.status_code == 200):
+            self.misses = self.misses + 1
+            self.__etag = response.headers.get('ETag')
+            self.__last_modified = response.headers.get('Last-Modified')
+        else:
+            # errors aren't cached
+            self.clear()
+            return False
+
+        self.__expires = time.time() + self.__max_age(response.headers.get('Cache-Control', ''))
+
+        return result
+
+    def clear(self):
+        """forget the stored validators, the next request will be a full request"""
+        self.__etag = None
+        self.__last_modified = None
+        self.__expires = 0
+
+    def get_stats(self):
+        """:returns: dict with the hit, not modified, and miss counts along with the hit rate"""
+        total = self.hits + self.not_modified + self.misses
+
+        return {"hits": self.hits, "not_modified": self.not_modified, "misses": self.misses,
+                "hit_rate": round((self.hits + self.not_modified) / total, 2) if total > 0 else 0}
+
+    def __max_age(self, cache_control):
+        """:returns: seconds the response can be used without checking the server"""
+        directives = cache_control.lower()
+
+        if('no-store' in directives or 'no-cache' in directives):
+            return 0
+
+        match = re.search(r'max-age=(\d+)', directives)
+
+        return int(match.group(1)) if match else 0
@@ -0,0 +1,81 @@
+"""
+Copyright 2026 Rob Weber
+This file is part of ha-betabrite-sign
+omni-epd is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import requests
+import threading
+from requests.adapters import HTTPAdapter
+
+
+class HttpClient:
+    """Shared HTTP client for REST and Home Assistant requests. Connections are
+    kept alive in a pool for each host so they can be reused across polls instead of
+    doing a new TCP (and TLS) handshake for every request.
+    """
+    __session = None
+    __adapter = None
+    __lock = None
+    requests = 0  # total requests made
+
+    def __init__(self, pool_size=4):
+        """
+        :param pool_size: max number of connections to keep open per host, should match the number of polling threads
+        """
+        self.__lock = threading.Lock()
+        self.__adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+
+        self.__session = requests.Session()
+        self.__session.mount('http://', self.__adapter)
+        self.__session.mount('https://', self.__adapter)
+
+    def request(self, method, url, **kwargs):
+        """make an HTTP request, arguments are the same as requests.request()
+
+        :param method: the HTTP method (get, post)
+        :param url: the full url
+
+        :returns: the requests Response object
+        """
+        with self.__lock:
+            self.requests = self.requests + 1
+
+        return self.__session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        """make a GET request, see request()"""
+        return self.request('get', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """make a POST request, see request()"""
+        return self.request('post', url, **kwargs)
+
+    def get_stats(self):
+        """get connection reuse statistics
+
+        :returns: dict with total requests, connections opened, and requests that reused a connection
+        """
+        connections = 0
+
+        pools = self.__adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if(pool is not None):
+                connections = connections + pool.num_connections
+
+        return {"requests": self.requests, "connections": connections,
+                "reused": max(self.requests - connections, 0)}
+
+    def close(self):
+        """close all open connections"""
+        self.__session.close()
@@ -0,0 +1,127 @@
+"""
+Copyright 2026 Rob Weber
+This file is part of ha-betabrite-sign
+omni-epd is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import glob
+import hashlib
+import jinja2
+import logging
+import os
+import pickle
+from importlib.metadata import entry_points
+from . import constants
+from .variable_registry import ENTRY_POINT_GROUP
+
+
+class LayoutCache:
+    """Keeps a compiled copy of the layout on disk so it doesn't have to be parsed, validated,
+    and analyzed again on each start. Entries are keyed on a hash of the layout, schema, program
+    source, and installed variable type plugins so any change to them is a cache miss and the
+    layout is loaded normally.
+
+    Compiled Jinja templates are kept in the same directory, see get_bytecode_cache().
+    """
+    path = None
+    __bytecode_cache = None
+
+    def __init__(self, path):
+        """
+        :param path: the directory to keep cached files in, created if it doesn't exist
+        """
+        self.path = path
+        os.makedirs(os.path.join(path, 'templates'), exist_ok=True)
+
+    def get_key(self, *files):
+        """create a cache key from the contents of the given files, the program source,
+        and the versions of any packages adding variable types. Cached variables are pickled
+        objects so any change to the code that creates them must be a cache miss
+
+        :param files: paths of the files the cached data is built from
+
+        :returns: the key as a hex string
+        """
+        digest = hashlib.sha256(constants.PROJECT_VERSION.encode('utf-8'))
+
+        # every python file in this package
+        libDir = os.path.dirname(os.path.abspath(__file__))
+        sources = sorted(glob.glob(os.path.join(libDir, '**', '*.py'), recursive=True))
+
+        for f in list(files) + sources:
+            with open(f, 'rb') as file:
+                digest.update(file.read())
+
+        # variable type plugins
+        eps = entry_points()
+        eps = eps.select(group=ENTRY_POINT_GROUP) if hasattr(eps, 'select') else eps.get(ENTRY_POINT_GROUP, [])
+
+        for ep in sorted(eps, key=lambda e: e.name):
+            dist = getattr(ep, 'dist', None)
+            version = f"{dist.name}=={dist.version}" if dist is not None else ''
+            digest.update(f"{ep.name}:{ep.value}:{version}".encode('utf-8'))
+
+        return digest.hexdigest()
+
+    def load(self, key):
+        """load the data saved for this key
+
+        :param key: the cache key, see get_key()
+
+        :returns: the saved data, None if nothing is saved for this key or it can't be read
+        """
+        result = None
+        cacheFile = self.__get_file(key)
+
+        if(os.path.exists(cacheFile)):
+            try:
+                with open(cacheFile, 'rb') as file:
+                    result = pickle.load(file)
+            except Exception as ex:
+                logging.warning(f"Can't read layout cache {cacheFile}, ignoring it: {ex}")
+
+        return result
+
+    def save(self, key, data):
+        """save the data for this key, replacing anything saved for an older layout
+
+        :param key: the cache key, see get_key()
+        :param data: the data to save, must be able to be pickled
+        """
+        cacheFile = self.__get_file(key)
+
+        try:
+            with open(f"{cacheFile}.tmp", 'wb') as file:
+                pickle.dump(data, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+            os.replace(f"{cacheFile}.tmp", cacheFile)
+        except Exception as ex:
+            logging.warning(f"Can't save layout cache {cacheFile}: {ex}")
+            return
+
+        # only the current layout is kept, along with its compiled templates
+        oldFiles = [f for f in glob.glob(os.path.join(self.path, 'layout-*.pickle')) if f != cacheFile]
+        for f in oldFiles:
+            os.remove(f)
+
+        if(len(oldFiles) > 0):
+            self.get_bytecode_cache().clear()
+
+    def get_bytecode_cache(self):
+        """:returns: a Jinja BytecodeCache keeping compiled templates in the cache directory"""
+        if(self.__bytecode_cache is None):
+            self.__bytecode_cache = jinja2.FileSystemBytecodeCache(os.path.join(self.path, 'templates'))
+
+        return self.__bytecode_cache
+
+    def __get_file(self, key):
+        return os.path.join(self.path, f"layout-{key[:16]}.pickle")
@@ -17,16 +17,21 @@ import alphasign
 import jinja2
 import logging
 import sys
+import time
 import yaml
+import zlib
 from cerberus import Validator
 from termcolor import colored
 from . import constants
 from . import jinja_custom
-from .types.home_assistant import HomeAssistantVariable
-from .types.mqtt import MQTTVariable, MQTTPushVariable, TimerVariable
-from .types.rest import RestVariable
-from .types.text import DynamicVariable, StaticVariable
-from .types.time import DateVariable, TimeVariable
+from . import metrics
+from .template_cache import TemplateCache
+from .memory_planner import MemoryPlanner
+from .topic_index import TopicIndex
+from .variable_registry import VariableRegistry
+
+SCHEMA_FILE = 'src/resources/schema.yaml'
+SYSTEM_FILE = 'src/resources/system.yaml'
 
 
 class MessageManager:
@@ -38,17 +43,43 @@ class MessageManager:
     config = None  # yaml file
     stringObjs = {}  # alphasign string object Ids
     textObjs = {}  # alphasign text object ids
+    signShadow = None  # last packet written to the sign for each label
     runList = {}
     varObjs = {}  # variables, extending VariableType
+    __categories = None  # variables grouped by category
+    __topics = None  # mqtt variables indexed by topic
+    __sizes = None  # allocated size of each string label
+    __lengths = None  # longest text written to each string variable
 
-    def __init__(self, configFile):
-        """:param configFile: path to the yaml configuration file"""
+    def __init__(self, configFile, cache=None, registry=None):
+        """
+        :param configFile: path to the yaml configuration file
+        :param cache: optional LayoutCache, an unchanged layout is loaded from it without being validated again
+        :param registry: optional VariableRegistry, by default the built in types and any added by installed packages
+        """
+        self.stringObjs = {}
+        self.textObjs = {}
+        self.signShadow = {}
+        self.runList = {}
+        self.varObjs = {}
+        self.__sizes = {}
+        self.__lengths = {}
+
+        if(cache is not None):
+            key = cache.get_key(SCHEMA_FILE, SYSTEM_FILE, configFile)
+            cached = cache.load(key)
+
+            if(cached is not None):
+                logging.debug(f"Loaded {configFile} from the layout cache")
+                self.config, self.varObjs = cached
+                self.__index_variables()
+                return
 
         # load the schema and system variables
-        with open('src/resources/schema.yaml', 'r') as file:
+        with open(SCHEMA_FILE, 'r') as file:
             schema = yaml.safe_load(file)
 
-        with open('src/resources/system.yaml', 'r') as file:
+        with open(SYSTEM_FILE, 'r') as file:
             system_config = yaml.safe_load(file)
 
         # load the user layout file
@@ -58,6 +89,12 @@ class MessageManager:
         # merge user and system variables
         self.config['variables'] = self.config['variables'] | system_config['variables']
 
+        # allow all known variable types, and the options of any added types this layout uses
+        if(registry is None):
+            registry = VariableRegistry()
+
+        registry.update_schema(schema, {aVar.get('type') for aVar in self.config['variables'].values() if isinstance(aVar, dict)})
+
         # validate the config, kill the program if invalid
         v = Validator(schema)
         if(not v.validate(self.config, schema)):
@@ -66,33 +103,46 @@ class MessageManager:
             sys.exit(2)
 
         # load all variable objects right away
-        self.__load_variables()
+        self.__load_variables(registry)
+        self.__index_variables()
+
+        # variables depending on each other in a loop can never be rendered
+        jinjaVars = self.get_variables_by_filter(constants.JINJA_CATEGORY)
+        try:
+            sort_dependencies(build_dependencies(jinjaVars), [v.get_name() for v in jinjaVars])
+        except DependencyCycleError as ex:
+            logging.error(f"Error in layout file: {configFile}")
+            logging.error(str(ex))
+            sys.exit(2)
+
+        if(cache is not None):
+            cache.save(key, (self.config, self.varObjs))
 
-    def __load_variables(self):
+    def __load_variables(self, registry):
         """create VariableType objects from the variables
         key in the yaml file
+
+        :param registry: the VariableRegistry to look up each variable type in
         """
         for v in self.config['variables'].keys():
             aVar = self.config['variables'][v]
 
-            if(aVar['type'] == 'date'):
-                self.varObjs[v] = DateVariable(v, aVar)
-            elif(aVar['type'] == 'mqtt'):
-                self.varObjs[v] = MQTTVariable(v, aVar)
-            elif(aVar['type'] == 'mqtt_push'):
-                self.varObjs[v] = MQTTPushVariable(v, aVar)
-            elif(aVar['type'] == 'home_assistant'):
-                self.varObjs[v] = HomeAssistantVariable(v, aVar)
-            elif(aVar['type'] == 'static'):
-                self.varObjs[v] = StaticVariable(v, aVar)
-            elif(aVar['type'] == 'time'):
-                self.varObjs[v] = TimeVariable(v, aVar)
-            elif(aVar['type'] == 'rest'):
-                self.varObjs[v] = RestVariable(v, aVar)
-            elif(aVar['type'] == 'dynamic'):
-                self.varObjs[v] = DynamicVariable(v, aVar)
-            elif(aVar['type'] == 'timer'):
-                self.varObjs[v] = TimerVariable(v, aVar)
+            self.varObjs[v] = registry.create(aVar['type'], v, aVar)
+
+    def __index_variables(self):
+        """group the loaded variables for fast lookups"""
+        # group the variables by category, these don't change once loaded
+        categories = {}
+        for aVar in self.varObjs.values():
+            for c in aVar.get_categories():
+                categories.setdefault(c, []).append(aVar)
+
+        self.__categories = {c: tuple(categories[c]) for c in categories}
+
+        # index the mqtt variables by topic for fast lookups when messages arrive
+        self.__topics = TopicIndex()
+        for aVar in self.get_variables_by_filter(constants.MQTT_CATEGORY):
+            self.__topics.add(aVar.get_topic(), aVar)
 
     def __get_char(self, start, offset):
         """helper method to return a single character based on the
@@ -167,17 +217,26 @@ class MessageManager:
         """
         return self.textObjs[name]
 
-    def startup(self, betabrite):
+    def startup(self, betabrite, text=None, planner=None):
         """initializes alphasign objects to load into sign memory
         :param betabrite: a valid alphasign BaseInterface
+        :param text: optional dict of variable name: text to load instead of the startup text
+        :param planner: optional MemoryPlanner to size Strings with, by default Strings use the max size
 
         :returns: a dict containing objects to allocate and write to the sign
         """
         allocateStrings = {}  # name: stringObj value
         allocateText = []  # textObjs
 
-        # create a special message for when the sign is off
-        offMessage = alphasign.Text(data="", label=self.__allocate_text(constants.SIGN_OFF), mode=constants.ALPHA_MODES['hold'])
+        if(planner is None):
+            planner = MemoryPlanner()
+
+        # lengths seen in earlier runs are kept, variables no longer in the layout are dropped
+        self.__lengths = {name: length for name, length in planner.get_observed_lengths().items() if name in self.varObjs}
+
+        # create a special message for when the sign is off, it only ever holds a single space
+        offMessage = alphasign.Text(data="", label=self.__allocate_text(constants.SIGN_OFF), size=planner.get_text_size(' '),
+                                    mode=constants.ALPHA_MODES['hold'])
         allocateText.append(offMessage)
 
         # load all queues from the display section of the yaml file
@@ -208,17 +267,27 @@ class MessageManager:
                             cliText.append(colored(v, 'green'))
                         else:
                             logging.info(f"Loading variable {aVar.get_name()}:{aVar.get_type()} for message")
-                            if(aVar.get_type() == 'time'):
-                                stringObj = aVar.get_text()
-                                betabrite.write(stringObj.set_format(aVar.get_time_format()))  # write the time format
-                                betabrite.write(stringObj.set())
+                            stringObj = aVar.get_sign_object()
+                            if(stringObj is not None):
+                                # the sign keeps this up to date, write any setup it needs
+                                for packet in aVar.get_sign_setup():
+                                    betabrite.write(packet)
                                 betabrite.write(stringObj)
                                 cliText.append(colored(aVar.get_startup(), 'green'))
                             else:
-                                stringObj = alphasign.String(data=aVar.get_startup(),
-                                                             label=self.__allocate_string(aVar.get_name()), size=125)
+                                startText = aVar.get_startup()
+                                if(text is not None and v in text):
+                                    startText = text[v]
+                                elif(startText != ""):
+                                    # startup text from the layout is shown on the sign too
+                                    self.__record_length(v, startText)
+
+                                label = self.__allocate_string(aVar.get_name())
+                                self.__sizes[label] = planner.get_string_size(aVar)
+
+                                stringObj = alphasign.String(data=startText[:self.__sizes[label]], label=label, size=self.__sizes[label])
                                 allocateStrings[v] = stringObj
-                                cliText.append(colored(aVar.get_startup(), 'green'))
+                                cliText.append(colored(startText, 'green'))
 
                         stringText.append(f"{aVar.get_display_params()}{stringObj.call()}")
                     else:
@@ -228,8 +297,11 @@ class MessageManager:
                 # create text object, setting the string text
                 logging.debug(f"'{' '.join(cliText)}' - MODE: {aMessage['mode']}")
                 messageParams = self.__generate_text_params(aMessage)
-                alphaObj = alphasign.Text("%s%s" % (messageParams, ' '.join(stringText)), mode=constants.ALPHA_MODES[aMessage['mode']],
-                                          label=self.__allocate_text(f"{self.MESSAGE_TEXT}_{q}_{i}"))
+                textData = "%s%s" % (messageParams, ' '.join(stringText))
+
+                # messages don't change once loaded, only allocate what they need
+                alphaObj = alphasign.Text(textData, mode=constants.ALPHA_MODES[aMessage['mode']],
+                                          label=self.__allocate_text(f"{self.MESSAGE_TEXT}_{q}_{i}"), size=planner.get_text_size(textData))
 
                 allocateText.append(alphaObj)
 
@@ -238,11 +310,13 @@ class MessageManager:
         # return objects that should be loaded into sign memory
         return {"run": self.runList['main'], "allocate": allocateText + list(allocateStrings.values())}
 
-    def update_string(self, name, message):
+    def update_string(self, name, message, record=True):
         """Updates a string object on the sign with a new message
 
         :param name: the name, as defined in yaml, of the variable to update
         :message message: the new message
+        :param record: if the length of this message should be used to size the String on the next startup,
+        False for placeholder text such as templates rendered before their dependencies have payloads
 
         :returns: alphasign String object that can be written to the sign
         """
@@ -250,8 +324,31 @@ class MessageManager:
         id = self.__get_string(name)
 
         if(id is not None):
+            if(record):
+                self.__record_length(name, message)
+
+            # text longer than the allocated size is cut off
+            size = self.__sizes[id]
+            if(len(message) > size):
+                logging.warning(f"{name} is longer than its {size} character String, truncating it. Set max_length to allocate more")
+
             # create the string object
-            result = alphasign.String(data=message, label=id, size=125)
+            result = alphasign.String(data=message[:size], label=id, size=size)
+
+        return result
+
+    def get_observed_lengths(self):
+        """:returns: dict of variable name: the longest text written to the variable's String, in this or earlier runs"""
+        return dict(self.__lengths)
+
+    def __record_length(self, name, message):
+        """keep track of the longest text for this variable, used to size its String on the next startup"""
+        self.__lengths[name] = max(len(message), self.__lengths.get(name, 0))
+
+    def get_label_names(self):
+        """:returns: dict of sign label: the variable or message name allocated to it"""
+        result = {label: name for name, label in self.textObjs.items()}
+        result.update({label: name for name, label in self.stringObjs.items()})
 
         return result
 
@@ -269,6 +366,32 @@ class MessageManager:
         """
         return alphasign.Text(data=message, label=self.__get_text(name), priority=priority)
 
+    def shadow_matches(self, label, packet):
+        """checks if the sign already holds this exact data for the given label,
+        based on what has been written to the sign previously
+
+        :param label: the sign label (string, text, or run sequence key)
+        :param packet: the data to be written to this label
+
+        :returns: True if this packet is the last one written to this label
+        """
+        return self.signShadow.get(label) == packet
+
+    def update_shadow(self, label, packet=None):
+        """record what was written to the sign for a label
+
+        :param label: the sign label
+        :param packet: the data written to the label, None if unknown (such as a failed write)
+        """
+        if(packet is None):
+            self.signShadow.pop(label, None)
+        else:
+            self.signShadow[label] = packet
+
+    def clear_shadow(self):
+        """forget everything written to the sign, used when the sign memory is cleared"""
+        self.signShadow.clear()
+
     def find_active_queue(self, evaluator):
         """returns the currently active message queue from evaluating the active_template
         associated with each queue. If none are found "main" is returned
@@ -289,6 +412,31 @@ class MessageManager:
 
         return result
 
+    def get_setting(self, name):
+        """get a value from the settings section of the layout file, using
+        the default value if it isn't set
+
+        :param name: the name of the setting
+
+        :returns: the setting value
+        """
+        settings = constants.SETTINGS_DEFAULTS | self.config.get('settings', {})
+
+        return settings[name]
+
+    def get_queue_templates(self):
+        """get the active_template for each message queue that defines one
+
+        :returns: a list of template strings
+        """
+        result = []
+
+        for q in self.config['display']:
+            if('active_template' in self.config['display'][q]):
+                result.append(self.config['display'][q]['active_template'])
+
+        return result
+
     def get_queue(self, name):
         """get the message queue given by the name, if it exits, otherwise return the main queue
 
@@ -313,6 +461,16 @@ class MessageManager:
         """
         return self.varObjs[name]
 
+    def get_variables_by_topic(self, topic):
+        """finds all MQTT variables subscribed to the given topic, this includes
+        variables subscribed using the + or # wildcards
+
+        :param topic: the topic a message was received on
+
+        :returns: a list of VariableType objects, blank list if none found
+        """
+        return self.__topics.match(topic)
+
     def get_variable_by_filter(self, category, func=lambda v: True):
         """exact same functionality as get_variables_by_filter below
         however this is guarenteed to return a single result instead of a list
@@ -342,7 +500,18 @@ class MessageManager:
         if(not isinstance(category, list)):
             category = [category]
 
-        return list(filter(lambda v: len(set(v.get_categories()).intersection(category)) > 0 and func(v), self.varObjs.values()))
+        if(len(category) == 1):
+            foundVars = self.__categories.get(category[0], ())
+        else:
+            # combine the categories, a variable may be in more than one
+            combined = {}
+            for c in category:
+                for v in self.__categories.get(c, ()):
+                    combined[v.get_name()] = v
+
+            foundVars = combined.values()
+
+        return list(filter(func, foundVars))
 
     def update_variable_state(self, name, state_name, value):
         """ update the internal states dictionary of a Stateful type variable
@@ -367,19 +536,38 @@ class PayloadManager:
     templates via Jinja
     """
     __jinja_env = None
+    __templates = None
     __rendered_templates = None
     __payloads = None
     __depends = None
+    __order = None
+    __derived = None
+    __checks = None
+    __metrics = None
+    __slow_threshold = None
 
-    def __init__(self, vars):
+    def __init__(self, vars, templates=(), metrics=None, bytecode_cache=None):
         """
         :params vars: list of Jinja variable objects
+        :params templates: list of any additional template strings to pre-compile, such as queue active templates
+        :params metrics: optional MetricsRegistry to record render times to
+        :params bytecode_cache: optional jinja2 BytecodeCache to load compiled templates from
+
+        :raises DependencyCycleError: if variables depend on each other in a loop
         """
+        self.__metrics = metrics
+
         # initalize each variable
         var_names = [v.get_name() for v in vars]
         self.__payloads = dict.fromkeys(var_names, "")
         self.__rendered_templates = dict.fromkeys(var_names, "")
 
+        # dynamic variables have no payload of their own, their rendered text is used instead
+        self.__derived = {v.get_name() for v in vars if v.get_type() == 'dynamic'}
+
+        # checksum of each template, saved rendered text is only valid for the same template
+        self.__checks = {v.get_name(): zlib.crc32(str(v.get_text()).encode('utf-8')) for v in vars}
+
         # setup jinja environment - functions and filters
         self.__jinja_env = jinja2.Environment()
         self.__jinja_env.globals['get_payload'] = self.get_payload
@@ -394,14 +582,18 @@ class PayloadManager:
         self.__jinja_env.filters['shorten_urls'] = jinja_custom.shorten_urls
         self.__jinja_env.filters['color'] = jinja_custom.set_color
 
-        # get any variable dependencies
-        self.__depends = {}
+        # compile all known templates once, other template strings are cached as they're used
+        self.__templates = TemplateCache(self.__jinja_env, bytecode_cache=bytecode_cache)
         for v in vars:
-            for d in v.get_dependencies():
-                if(d in self.__depends.keys()):
-                    self.__depends[d].append(v.get_name())
-                else:
-                    self.__depends[d] = [v.get_name()]
+            for t in v.get_templates():
+                self.__templates.pin(t)
+
+        for t in templates:
+            self.__templates.pin(t)
+
+        # get any variable dependencies and the order to render them in
+        self.__depends = build_dependencies(vars)
+        self.__order = sort_dependencies(self.__depends, var_names)
 
     def set_payload(self, var, payload):
         """set the given payload for this variable name
@@ -410,6 +602,14 @@ class PayloadManager:
         """
         self.__payloads[var] = payload
 
+    def set_payloads(self, payloads):
+        """set the payloads for several variables at once, they're applied in a single
+        update so templates rendering on other threads see all of them or none of them
+
+        :param payloads: dict of variable name: payload
+        """
+        self.__payloads.update(payloads)
+
     def get_payload(self, var):
         """return the payload, if any, for this variable
 
@@ -486,6 +686,83 @@ class PayloadManager:
 
         return result
 
+    def get_render_order(self, changed):
+        """get the variables that need to be rendered after the payloads of the given variables have
+        changed. This includes the variables themselves and everything that depends on them, directly or
+        through other variables. Each variable is listed once, after any variables it depends on.
+
+        :param changed: list of variable names with new payloads
+
+        :returns: list of variable names in the order they should be rendered
+        """
+        dirty = set()
+        stack = list(changed)
+
+        while(len(stack) > 0):
+            name = stack.pop()
+
+            if(name not in dirty):
+                dirty.add(name)
+                stack.extend(self.get_dependencies(name))
+
+        return sorted(dirty, key=lambda n: self.__order.get(n, -1))
+
+    def set_slow_threshold(self, seconds):
+        """log a warning when a variable takes longer than this to render
+
+        :param seconds: the threshold in seconds, None to turn off
+        """
+        self.__slow_threshold = seconds
+
+    def clear_rendered(self):
+        """forget the last rendered text of each variable so the next render
+        of every variable is treated as a change
+        """
+        self.__rendered_templates = dict.fromkeys(self.__rendered_templates.keys(), "")
+
+    def get_snapshot(self):
+        """get the current payloads and rendered text so they can be saved, see restore()
+
+        :returns: dict of payloads and rendered text for each variable
+        """
+        rendered = {name: [self.__checks[name], text] for name, text in list(self.__rendered_templates.items()) if text != ""}
+
+        return {"payloads": dict(self.__payloads), "rendered": rendered}
+
+    def restore(self, snapshot):
+        """restore payloads and rendered text saved with get_snapshot(), such as from before
+        a restart. Rendered text is skipped for variables whose template has changed since
+        it was saved
+
+        :param snapshot: the dict returned by get_snapshot()
+
+        :returns: dict of variable name: rendered text for each variable restored
+        """
+        self.__payloads.update(snapshot['payloads'])
+
+        result = {}
+        for name, saved in snapshot['rendered'].items():
+            if(self.__checks.get(name) == saved[0]):
+                result[name] = saved[1]
+
+        self.__rendered_templates.update(result)
+
+        return result
+
+    def get_cache_stats(self):
+        """:returns: dict of compiled template cache statistics (hits, misses, pinned, cached)"""
+        return self.__templates.get_stats()
+
+    def has_dependencies(self, var):
+        """check if every variable this variable's template uses has a payload, until they do the
+        template only renders placeholder text
+
+        :param var: the variable object
+
+        :returns: True/False
+        """
+        return all(self.get_payload(d) != "" for d in var.get_dependencies())
+
     def has_value(self, var):
         """does this variable have a valid payload
         :param var: the variable name
@@ -504,7 +781,7 @@ class PayloadManager:
 
         :returns: boolean value, True/False
         """
-        template = self.__jinja_env.from_string(template_str)
+        template = self.__templates.get(template_str)
 
         # evaluate it and return the result as a boolean
         result = template.render(value=self.get_payload(var)).strip()
@@ -521,13 +798,24 @@ class PayloadManager:
         """
         result = None  # assume no change
 
+        start = time.perf_counter()
         r = self.render_template(var.get_text(), var.get_name())
+        elapsed = time.perf_counter() - start
+
+        if(self.__metrics is not None):
+            self.__metrics.observe(metrics.RENDER_SECONDS, elapsed, variable=var.get_name())
+
+        if(self.__slow_threshold is not None and elapsed >= self.__slow_threshold):
+            logging.warning(f"Slow template: {var.get_name()} took {elapsed * 1000:.1f}ms to render")
 
         if(r != self.__rendered_templates[var.get_name()]):
             # return result if different than previous
             result = r
             self.__rendered_templates[var.get_name()] = result
 
+            if(var.get_name() in self.__derived):
+                self.__payloads[var.get_name()] = result
+
         return result
 
     def render_template(self, template_string, var=None):
@@ -538,7 +826,7 @@ class PayloadManager:
 
         :returns: the result of the rendered template
         """
-        template = self.__jinja_env.from_string(template_string)
+        template = self.__templates.get(template_string)
 
         if(var is None):
             result = template.render()
@@ -548,6 +836,92 @@ class PayloadManager:
         return result.strip()
 
 
+def build_dependencies(vars):
+    """find the variables that depend on each variable, a variable using its own
+    payload doesn't need to be re-rendered so it isn't included
+
+    :param vars: list of Jinja variable objects
+
+    :returns: dict of variable name: list of the variable names that depend on it
+    """
+    result = {}
+    for v in vars:
+        for d in v.get_dependencies():
+            if(d == v.get_name()):
+                continue
+
+            if(d in result.keys()):
+                result[d].append(v.get_name())
+            else:
+                result[d] = [v.get_name()]
+
+    return result
+
+
+def sort_dependencies(depends, var_names):
+    """topologically sort the dependency graph so variables are always rendered after
+    the variables they depend on
+
+    :param depends: the dependency graph, see build_dependencies()
+    :param var_names: list of all variable names
+
+    :returns: dict of variable name to its position in the render order
+    :raises DependencyCycleError: if there is a loop in the dependencies
+    """
+    # count how many variables each one depends on
+    nodes = list(dict.fromkeys(var_names + list(depends.keys())))
+    incoming = dict.fromkeys(nodes, 0)
+    for dependents in depends.values():
+        for d in dependents:
+            incoming[d] = incoming[d] + 1
+
+    result = {}
+    ready = [n for n in nodes if incoming[n] == 0]
+    while(len(ready) > 0):
+        name = ready.pop(0)
+        result[name] = len(result)
+
+        for d in depends.get(name, []):
+            incoming[d] = incoming[d] - 1
+            if(incoming[d] == 0):
+                ready.append(d)
+
+    if(len(result) < len(nodes)):
+        raise DependencyCycleError(_find_cycle(depends, [n for n in nodes if n not in result]))
+
+    return result
+
+
+def _find_cycle(depends, names):
+    """walk the dependencies of variables left over from the sort to find the loop
+
+    :param depends: the dependency graph, see build_dependencies()
+    :param names: variable names that could not be sorted
+
+    :returns: list of variable names forming the loop
+    """
+    # every unsorted variable depends on at least one other unsorted variable, following these must loop
+    parents = {n: [p for p in names if n in depends.get(p, [])] for n in names}
+
+    path = [names[0]]
+    while(parents[path[-1]][0] not in path):
+        path.append(parents[path[-1]][0])
+
+    cycle = path[path.index(parents[path[-1]][0]):]
+    cycle.reverse()
+
+    return cycle + [cycle[0]]
+
+
+class DependencyCycleError(Exception):
+    """This error is thrown when variables reference each other in a loop
+    through get_payload() or similar functions, so there is no order to render them in
+    """
+
+    def __init__(self, cycle):
+        super().__init__(f"Variable dependencies form a loop: {' -> '.join(cycle)}")
+
+
 class UndefinedVariableError(Exception):
     """This error is thrown when the key passed to lookup a variable
     cannot be found. It most likely does not exist in the config file
@@ -0,0 +1,118 @@
+"""
+Copyright 2026 Rob Weber
+This file is part of ha-betabrite-sign
+omni-epd is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import alphasign
+import math
+
+MAX_SIZE = 125  # largest file alphasign will allocate
+MIN_STRING_SIZE = 16  # smallest String sized from observed text, leaves room for short values to grow
+HEADROOM = 1.25  # extra room given to Strings sized from observed text
+TEXT_OVERHEAD = 4  # control bytes stored with each Text, ESC + display position + mode (up to 2 bytes)
+TARGET_FILES_SIZE = 5 * 100  # alphasign allocates 5 target Text files of 100 bytes with every layout
+
+
+class MemoryPlanner:
+    """Works out how much sign memory to allocate for each String. A String is sized from the
+    variable max_length option if it's set, otherwise from the longest text seen for the variable
+    (such as from the snapshot) with some room to grow, or the largest size if nothing is known.
+
+    The full allocation can be checked against the free memory on the sign before anything is
+    written, so a layout that doesn't fit fails on startup instead of losing messages on the sign.
+    """
+    __observed = None
+
+    def __init__(self, observed=None):
+        """
+        :param observed: optional dict of variable name: longest text seen for the variable
+        """
+        self.__observed = observed if observed is not None else {}
+
+    def get_observed_lengths(self):
+        """:returns: dict of variable name: longest text seen for the variable, as given to the planner"""
+        return dict(self.__observed)
+
+    def get_string_size(self, var):
+        """get the number of bytes to allocate for this variable's String
+
+        :param var: the variable object
+
+        :returns: the String size
+        """
+        result = MAX_SIZE
+
+        if(var.config.get('max_length') is not None):
+            result = var.config['max_length']
+        elif(var.get_name() in self.__observed):
+            result = max(math.ceil(self.__observed[var.get_name()] * HEADROOM), MIN_STRING_SIZE)
+
+        return min(result, MAX_SIZE)
+
+    def get_text_size(self, data):
+        """get the number of bytes to allocate for a Text holding this data, Text files
+        also store the display position and mode control bytes before the data
+
+        :param data: the text data, including any formatting codes
+
+        :returns: the Text size
+        """
+        return min(len(data) + TEXT_OVERHEAD, MAX_SIZE)
+
+    def get_plan(self, objects, names=None):
+        """list the memory used by each object, largest first
+
+        :param objects: the alphasign Text and String objects to allocate
+        :param names: optional dict of label: name to show for each object
+
+        :returns: list of (label, name, type, size) tuples, including the alphasign target files
+        """
+        names = names if names is not None else {}
+
+        result = [(o.label, names.get(o.label, ''), 'string' if isinstance(o, alphasign.String) else 'text', o.size) for o in objects]
+        result.sort(key=lambda p: p[3], reverse=True)
+        result.append(('1-5', 'target files', 'text', TARGET_FILES_SIZE))
+
+        return result
+
+    def get_total(self, objects):
+        """:returns: the total bytes needed to allocate these objects"""
+        return sum([o.size for o in objects]) + TARGET_FILES_SIZE
+
+    def check(self, objects, free_memory, names=None):
+        """make sure the objects will fit in the free memory on the sign
+
+        :param objects: the alphasign Text and String objects to allocate
+        :param free_memory: bytes of free memory on the sign
+        :param names: optional dict of label: name to show in the error
+
+        :raises SignMemoryError: if the objects need more memory than is free
+        """
+        total = self.get_total(objects)
+
+        if(total > free_memory):
+            raise SignMemoryError(total, free_memory, self.get_plan(objects, names))
+
+
+class SignMemoryError(Exception):
+    """This error is thrown when the layout needs more memory than is free on the sign,
+    the message includes how much memory each object needs
+    """
+    plan = None
+
+    def __init__(self, total, free_memory, plan):
+        self.plan = plan
+
+        breakdown = "\n".join([f"  {label:>3} {kind:<6} {size:>4} {name}" for label, name, kind, size in plan])
+        super().__init__(f"Layout needs {total} bytes of sign memory but only {free_memory} are free, "
+                         f"set max_length on variables to use less:\n{breakdown}")
@@ -0,0 +1,209 @@
+"""
+Copyright 2026 Rob Weber
+This file is part of ha-betabrite-sign
+omni-epd is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import bisect
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# metric names
+RENDER_SECONDS = 'betabrite_render_seconds'
+POLL_SECONDS = 'betabrite_poll_seconds'
+POLL_FAILURES = 'betabrite_poll_failures_total'
+SIGN_WRITE_SECONDS = 'betabrite_sign_write_seconds'
+SIGN_WRITE_BYTES = 'betabrite_sign_write_bytes_total'
+SIGN_WRITE_FAILURES = 'betabrite_sign_write_failures_total'
+QUEUE_SWAPS = 'betabrite_queue_swaps_total'
+MQTT_MESSAGES = 'betabrite_mqtt_messages_total'
+
+COUNTER = 'counter'
+HISTOGRAM = 'histogram'
+
+# type and description of each metric
+METRICS = {RENDER_SECONDS: (HISTOGRAM, "Time to render a variable template"),
+           POLL_SECONDS: (HISTOGRAM, "Time to poll a variable"),
+           POLL_FAILURES: (COUNTER, "Polls that failed"),
+           SIGN_WRITE_SECONDS: (HISTOGRAM, "Time to write to the sign"),
+           SIGN_WRITE_BYTES: (COUNTER, "Bytes written to the sign"),
+           SIGN_WRITE_FAILURES: (COUNTER, "Writes to the sign that failed"),
+           QUEUE_SWAPS: (COUNTER, "Times the active message queue changed"),
+           MQTT_MESSAGES: (COUNTER, "MQTT messages received")}
+
+# histogram bucket upper bounds, in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histogram:
+    """Counts observations into fixed buckets, along with the total and max"""
+    counts = None
+    sum = 0
+    count = 0
+    max = 0
+
+    def __init__(self):
+        # one extra bucket for values over the largest bound
+        self.counts = [0] * (len(BUCKETS) + 1)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum = self.sum + value
+        self.count = self.count + 1
+        self.max = max(self.max, value)
+
+
+class MetricsRegistry:
+    """Collects counters and histograms in memory. Each metric is split by labels, such as the
+    variable name. Recording a value is a dict lookup and an addition so it can be left on all the time.
+    """
+    __metrics = None
+    __lock = None
+
+    def __init__(self):
+        self.__metrics = {name: {} for name in METRICS}
+        self.__lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        """increment a counter
+
+        :param name: the metric name
+        :param value: the amount to add
+        :param labels: labels for this value, such as variable="name"
+        """
+        key = tuple(sorted(labels.items()))
+
+        with self.__lock:
+            values = self.__metrics[name]
+            values[key] = values.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """add a value to a histogram
+
+        :param name: the metric name
+        :param value: the value to add, in seconds
+        :param labels: labels for this value, such as variable="name"
+        """
+        key = tuple(sorted(labels.items()))
+
+        with self.__lock:
+            values = self.__metrics[name]
+            if(key not in values):
+                values[key] = Histogram()
+
+            values[key].observe(value)
+
+    def to_prometheus(self):
+        """:returns: all metrics in the Prometheus text format"""
+        lines = []
+
+        with self.__lock:
+            for name, values in self.__metrics.items():
+                type, help = METRICS[name]
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {type}")
+
+                for key, value in values.items():
+                    if(type == COUNTER):
+                        lines.append(f"{name}{self.__format_labels(key)} {value}")
+                    else:
+                        total = 0
+                        for bound, count in zip(list(BUCKETS) + ['+Inf'], value.counts):
+                            total = total + count
+                            lines.append(f"{name}_bucket{self.__format_labels(key + (('le', str(bound)), ))} {total}")
+
+                        lines.append(f"{name}_sum{self.__format_labels(key)} {value.sum}")
+                        lines.append(f"{name}_count{self.__format_labels(key)} {value.count}")
+
+        return '\n'.join(lines) + '\n'
+
+    def to_dict(self):
+        """summary of all metrics, histograms are reduced to the count, mean and max in milliseconds
+
+        :returns: dict of metric name: {label values: value}
+        """
+        result = {}
+
+        with self.__lock:
+            for name, values in self.__metrics.items():
+                result[name] = {}
+
+                for key, value in values.items():
+                    label = ','.join([str(v) for k, v in key]) if len(key) > 0 else 'total'
+
+                    if(isinstance(value, Histogram)):
+                        result[name][label] = {"count": value.count, "mean_ms": round(value.sum / value.count * 1000, 3),
+                                               "max_ms": round(value.max * 1000, 3)}
+                    else:
+                        result[name][label] = value
+
+        return result
+
+    def __format_labels(self, key):
+        if(len(key) == 0):
+            return ''
+
+        return '{' + ','.join([f'{k}="{self.__escape(v)}"' for k, v in key]) + '}'
+
+    def __escape(self, value):
+        """escape backslashes, quotes and new lines in label values"""
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsServer:
+    """Serves the metrics in the Prometheus text format at http://host:port/metrics"""
+    host = None
+    port = None
+
+    __server = None
+    __thread = None
+
+    def __init__(self, registry, port, host='127.0.0.1'):
+        """
+        :param registry: the MetricsRegistry to serve
+        :param port: the port to listen on
+        :param host: the address to bind to, localhost only by default
+        """
+        self.host = host
+        self.port = port
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if(self.path.split('?')[0] != '/metrics'):
+                    self.send_error(404)
+                    return
+
+                body = registry.to_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # don't log every scrape
+                pass
+
+        self.__server = ThreadingHTTPServer((host, port), Handler)
+
+    def start(self):
+        """start serving requests on a background thread"""
+        self.__thread = threading.Thread(target=self.__server.serve_forever, name="MetricsServer", daemon=True)
+        self.__thread.start()
+
+        logging.info(f"Serving metrics at http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        """stop the server"""
+        self.__server.shutdown()
+        self.__server.server_close()
@@ -0,0 +1,137 @@
+"""
+Copyright 2026 Rob Weber
+This file is part of ha-betabrite-sign
+omni-epd is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler:
+    """Profiles every thread by looking at their call stacks on an interval. This
+    can be started and stopped while the program is running, the overhead only depends on
+    the sampling interval and not on how many function calls are made.
+
+    Functions are counted as self time when they were running (top of the stack) and total time
+    when they were anywhere in the stack.
+    """
+    interval = 0.005  # seconds between samples
+    samples = 0
+    started = None
+
+    __self_counts = None
+    __total_counts = None
+    __thread_counts = None
+    __thread = None
+    __stop_event = None
+
+    def __init__(self, interval=0.005):
+        """
+        :param interval: seconds between samples
+        """
+        self.interval = interval
+        self.__self_counts = Counter()
+        self.__total_counts = Counter()
+        self.__thread_counts = Counter()
+        self.__stop_event = threading.Event()
+
+    def start(self, seconds, on_done=None):
+        """start sampling on a background thread
+
+        :param seconds: how long to profile for
+        :param on_done: optional function called with this profiler when sampling stops
+        """
+        self.started = time.time()
+        self.__thread = threading.Thread(target=self.__run, args=(seconds, on_done), name="Profiler", daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """stop sampling early"""
+        self.__stop_event.set()
+
+    def is_running(self):
+        """:returns: True if the profiler is sampling"""
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def get_top(self, count=25):
+        """get the functions with the most samples
+
+        :param count: the number of functions to return
+
+        :returns: list of dicts with the function, self and total percent of samples
+        """
+        result = []
+        total = max(self.samples, 1)
+
+        for func, hits in self.__self_counts.most_common(count):
+            result.append({"function": func, "self_pct": round(hits / total * 100, 1),
+                           "total_pct": round(self.__total_counts[func] / total * 100, 1)})
+
+        return result
+
+    def get_report(self, count=25):
+        """:returns: a text report of the top functions by self time and by total time"""
+        total = max(self.samples, 1)
+        lines = [f"Sampled {self.samples} times every {self.interval * 1000:.1f}ms from {time.ctime(self.started)}", "",
+                 "Samples by thread:"]
+
+        for name, hits in self.__thread_counts.most_common():
+            lines.append(f"  {hits / total * 100:6.1f}%  {name}")
+
+        lines.extend(["", "Top functions by self time:", "   self%  total%  function"])
+        for f in self.get_top(count):
+            lines.append(f"  {f['self_pct']:6.1f}  {f['total_pct']:6.1f}  {f['function']}")
+
+        lines.extend(["", "Top functions by total time:", "  total%  function"])
+        for func, hits in self.__total_counts.most_common(count):
+            lines.append(f"  {hits / total * 100:6.1f}  {func}")
+
+        return '\n'.join(lines) + '\n'
+
+    def __run(self, seconds, on_done):
+        """sampling thread"""
+        own = threading.get_ident()
+        end = time.monotonic() + seconds
+
+        while(time.monotonic() < end and not self.__stop_event.wait(self.interval)):
+            names = {t.ident: t.name for t in threading.enumerate()}
+
+            for ident, frame in sys._current_frames().items():
+                if(ident == own):
+                    continue
+
+                self.samples = self.samples + 1
+                self.__thread_counts[names.get(ident, str(ident))] += 1
+                self.__self_counts[self.__describe(frame)] += 1
+
+                # count each function once per stack, even if recursive
+                stack = set()
+                while(frame is not None):
+                    stack.add(self.__describe(frame))
+                    frame = frame.f_back
+
+                self.__total_counts.update(stack)
+
+        if(on_done is not None):
+            try:
+                on_done(self)
+            except Exception as ex:
+                logging.error(f"Error saving profile: {ex}")
+
+    def __describe(self, frame):
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
@@ -0,0 +1,90 @@
+"""
+Copyright 2026 Rob Weber
+This file is part of ha-betabrite-sign
+omni-epd is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import gzip
+import json
+import logging
+import threading
+import time
+
+# event types
+MQTT_EVENT = 'mqtt'  # message received on a topic
+REST_EVENT = 'rest'  # response text from a REST variable poll
+HA_EVENT = 'ha'  # rendered template for a Home Assistant variable
+
+
+def _open(path, mode):
+    """open a plain or gzip compressed (.gz) file in text mode"""
+    if(path.endswith('.gz')):
+        return gzip.open(path, f"{mode}t", encoding='utf-8')
+    else:
+        return open(path, mode, buffering=1, encoding='utf-8')
+
+
+def read_events(path):
+    """read the events from a recording file, in the order they were recorded
+
+    :param path: the recording file, may be gzip compressed
+
+    :returns: a generator of dicts with the time (t), event type (e), topic or variable name (n), and payload (p)
+    """
+    with _open(path, 'r') as f:
+        for line in f:
+            if(line.strip() != ''):
+                yield json.loads(line)
+
+
+class EventRecorder:
+    """Records the input to the sign (MQTT messages and polling results) to a file so it can
+    be replayed later. Each event is one line of JSON, use a .gz file name to compress the recording.
+    """
+    path = None
+    events = 0
+
+    __file = None
+    __lock = None
+
+    def __init__(self, path):
+        """
+        :param path: the file to record to, an existing file is appended to
+        """
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__file = _open(path, 'a')
+
+        logging.info(f"Recording events to {path}")
+
+    def record(self, event, name, payload):
+        """record a single event with the current time
+
+        :param event: the event type, MQTT_EVENT, REST_EVENT, or HA_EVENT
+        :param name: the MQTT topic or variable name
+        :param payload: the payload as a string
+        """
+        line = json.dumps({"t": round(time.time(), 3), "e": event, "n": name, "p": payload}, separators=(',', ':'))
+
+        with self.__lock:
+            if(self.__file is not None):
+                self.__file.write(line + '\n')
+                self.events = self.events + 1
+
+    def close(self):
+        """close the recording file"""
+        with self.__lock:
+            if(self.__file is not None):
+                self.__file.close()
+                self.__file = None
+
+                logging.info(f"Recorded {self.events} events to {self.path}")
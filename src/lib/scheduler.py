@@ -0,0 +1,187 @@
+"""
+Copyright 2026 Rob Weber
+This file is part of ha-betabrite-sign
+omni-epd is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime
+from . import constants
+
+
+class PollScheduler:
+    """Schedules polling variables using a min heap of the next time each
+    variable should be polled. Cron expressions are parsed once, after that only the
+    variables at the top of the heap are looked at. The main loop waits on the scheduler which
+    sleeps until the next variable is due, or the next housekeeping tick, whichever is first.
+
+    Stateful variables don't have a cron schedule, they are checked on the housekeeping tick, or
+    every second while their should_poll() method is True. Other threads can call wake() to have
+    a variable checked right away, such as when a timer is started.
+
+    How polls missed while the main loop was busy are handled depends on the catch up policy:
+      * once: run the missed poll once, then resume the normal schedule
+      * skip: missed polls later than the grace period are skipped
+    """
+    CATCH_UP_ONCE = 'once'
+    CATCH_UP_SKIP = 'skip'
+    ONE_OFF = -1  # generation for a single poll outside of the schedule
+
+    interval = 10  # housekeeping tick, in seconds
+    catch_up = CATCH_UP_ONCE
+    grace = 10  # seconds a poll can be late when catch up is skip
+
+    __vars = None
+    __schedules = None
+    __heap = None
+    __generation = None
+    __counter = 0
+    __next_tick = 0
+    __woken = False
+    __condition = None
+
+    def __init__(self, vars, interval=10, catch_up=CATCH_UP_ONCE, grace=10):
+        """
+        :param vars: list of PollingVariable objects to schedule
+        :param interval: the housekeeping tick interval in seconds
+        :param catch_up: the catch up policy for missed polls, once or skip
+        :param grace: seconds a poll can be late before it's skipped, when catch_up is skip
+        """
+        self.interval = interval
+        self.catch_up = catch_up
+        self.grace = grace
+
+        self.__vars = {}
+        self.__schedules = {}
+        self.__heap = []
+        self.__generation = {}
+        self.__condition = threading.Condition()
+
+        now = datetime.now()
+        self.__next_tick = self.__get_next_tick(now.timestamp())
+
+        for v in vars:
+            self.__vars[v.get_name()] = v
+            self.__generation[v.get_name()] = 0
+
+            if(constants.STATEFUL_CATEGORY in v.get_categories()):
+                self.__push(v.get_name(), self.__next_tick)
+            else:
+                # cron iterator is created once, get_next() moves it forward
+                self.__schedules[v.get_name()] = v.get_schedule(now)
+
+                # variables without a schedule are only polled when woken
+                if(self.__schedules[v.get_name()] is not None):
+                    self.__push(v.get_name(), self.__schedules[v.get_name()].get_next(datetime).timestamp())
+
+    def __get_next_tick(self, now):
+        """:returns: the next housekeeping time, aligned to the interval"""
+        return now - (now % self.interval) + self.interval
+
+    def __push(self, name, fire_time):
+        """add a variable to the heap, the counter keeps entries with the same time in order"""
+        self.__counter = self.__counter + 1
+        heapq.heappush(self.__heap, (fire_time, self.__counter, self.__generation[name], name))
+
+    def wake(self, name=None):
+        """wake the scheduler from another thread
+
+        :param name: a variable name to check right away, if None just wake the main loop
+        """
+        with self.__condition:
+            if(name in self.__schedules):
+                # poll once now, the cron schedule is unchanged
+                self.__counter = self.__counter + 1
+                heapq.heappush(self.__heap, (time.time(), self.__counter, self.ONE_OFF, name))
+            elif(name in self.__vars):
+                # invalidate the existing heap entry for this stateful variable
+                self.__generation[name] = self.__generation[name] + 1
+                self.__push(name, time.time())
+
+            self.__woken = True
+            self.__condition.notify()
+
+    def wait(self):
+        """block until at least one variable should be polled, the housekeeping
+        tick is reached, or the scheduler is woken
+
+        :returns: a list of variables that should be polled, may be empty
+        """
+        with self.__condition:
+            while(not self.__woken):
+                next_time = self.__next_tick
+                if(len(self.__heap) > 0):
+                    next_time = min(next_time, self.__heap[0][0])
+
+                remaining = next_time - time.time()
+                if(remaining <= 0):
+                    break
+
+                self.__condition.wait(remaining)
+
+            self.__woken = False
+            now = time.time()
+
+            if(now >= self.__next_tick):
+                self.__next_tick = self.__get_next_tick(now)
+
+            return self.__get_due(now)
+
+    def __get_due(self, now):
+        """pop all heap entries that are due, rescheduling each one
+
+        :returns: a list of variables that should be polled
+        """
+        result = []
+        current_time = datetime.fromtimestamp(now)
+
+        while(len(self.__heap) > 0 and self.__heap[0][0] <= now):
+            fire_time, count, generation, name = heapq.heappop(self.__heap)
+
+            aVar = self.__vars[name]
+            if(generation == self.ONE_OFF):
+                if(aVar not in result):
+                    result.append(aVar)
+            elif(generation != self.__generation[name]):
+                # skip entries replaced by a call to wake()
+                continue
+            elif(name not in self.__schedules):
+                # stateful variables are checked every second while active
+                if(aVar.should_poll(current_time, None)):
+                    if(aVar not in result):
+                        result.append(aVar)
+                    self.__push(name, now + 1)
+                else:
+                    self.__push(name, self.__next_tick)
+            else:
+                # move the schedule past the current time, counting any missed polls
+                missed = 0
+                next_time = self.__schedules[name].get_next(datetime).timestamp()
+                while(next_time <= now):
+                    missed = missed + 1
+                    next_time = self.__schedules[name].get_next(datetime).timestamp()
+
+                self.__push(name, next_time)
+
+                if(self.catch_up == self.CATCH_UP_SKIP and now - fire_time > self.grace):
+                    logging.warning(f"Skipping poll for {name}, {now - fire_time:.0f} seconds late")
+                else:
+                    if(missed > 0):
+                        logging.debug(f"{name} missed {missed} polls, polling once")
+
+                    if(aVar not in result):
+                        result.append(aVar)
+
+        return result
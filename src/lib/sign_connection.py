@@ -0,0 +1,239 @@
+"""
+Copyright 2026 Rob Weber
+This file is part of ha-betabrite-sign
+omni-epd is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import alphasign
+import logging
+import threading
+import time
+
+
+class SignConnection:
+    """Keeps a single long lived connection open to the sign instead of
+    opening and closing the serial device for each write. All access to the
+    alphasign interface goes through this class so it is also what makes sign
+    access thread safe.
+
+    If a write fails the connection is re-opened and the write tried again. When the
+    sign can't be reached reconnect attempts back off exponentially, writes made
+    during the backoff period fail right away instead of blocking the caller. The
+    SignWriter keeps the latest failed write for each label and replays it once
+    get_retry_delay() says the connection can be tried again.
+    """
+    __interface = None
+    __lock = None
+    __connected = False
+    __backoff = 0
+    __retry_at = 0
+    __last_health_check = 0
+
+    health_check = False  # if the sign should be probed periodically
+    health_interval = 300  # seconds between health checks
+    max_backoff = 60  # max seconds to wait between reconnect attempts
+
+    def __init__(self, interface, health_check=False, health_interval=300, max_backoff=60):
+        """
+        :param interface: the alphasign interface (Serial, DebugInterface) to use
+        :param health_check: True if the connection should be probed with read_information() on check_health()
+        :param health_interval: min seconds between health checks
+        :param max_backoff: max seconds to wait between reconnect attempts
+        """
+        self.__interface = interface
+        self.__lock = threading.RLock()
+        self.health_check = health_check
+        self.health_interval = health_interval
+        self.max_backoff = max_backoff
+
+    def __connect(self):
+        """open the connection, if not already connected, honoring any backoff time
+
+        :returns: True if connected
+        """
+        if(self.__connected):
+            return True
+
+        if(time.time() < self.__retry_at):
+            # still waiting to try again
+            return False
+
+        try:
+            self.__interface.connect()
+            self.__connected = True
+            self.__backoff = 0
+
+            logging.debug("Sign connection opened")
+        except Exception as ex:
+            # wait longer between each attempt, up to the max
+            self.__backoff = min(max(self.__backoff * 2, 1), self.max_backoff)
+            self.__retry_at = time.time() + self.__backoff
+
+            logging.error(f"Can't connect to sign, retrying in {self.__backoff} seconds: {ex}")
+
+        return self.__connected
+
+    def __disconnect(self):
+        """close the connection, ignoring any errors"""
+        try:
+            self.__interface.disconnect()
+        except Exception as ex:
+            logging.debug(f"Error closing sign connection: {ex}")
+
+        self.__connected = False
+
+    def __call(self, func, *args):
+        """call an interface function, reconnecting and retrying once if it fails
+
+        :param func: the name of the interface function to call
+        :param args: arguments to pass to the function
+
+        :returns: True if the call was successful
+        """
+        with self.__lock:
+            for attempt in range(0, 2):
+                if(not self.__connect()):
+                    return False
+
+                try:
+                    # interfaces return False when the write fails
+                    if(getattr(self.__interface, func)(*args) is not False):
+                        return True
+                except Exception as ex:
+                    logging.error(f"Sign {func} failed: {ex}")
+
+                # reset the connection and try again
+                self.__disconnect()
+
+            return False
+
+    def connect(self):
+        """open the connection to the sign
+
+        :returns: True if connected
+        """
+        with self.__lock:
+            return self.__connect()
+
+    def close(self):
+        """close the connection to the sign, used at shutdown"""
+        with self.__lock:
+            if(self.__connected):
+                self.__disconnect()
+                logging.debug("Sign connection closed")
+
+    def is_connected(self):
+        """:returns: True if the connection is currently open"""
+        return self.__connected
+
+    def get_retry_delay(self):
+        """:returns: seconds until the next reconnect attempt is allowed, 0 if connected or it can be tried now"""
+        return 0 if self.__connected else max(self.__retry_at - time.time(), 0)
+
+    def check_health(self):
+        """probe the sign by reading its information, if the read fails the
+        connection is reset so the next write will reconnect. Only runs if health checks
+        are enabled and the health interval has passed since the last check.
+
+        :returns: True if the sign is healthy or the check was skipped
+        """
+        result = True
+
+        if(self.health_check and time.time() - self.__last_health_check >= self.health_interval):
+            self.__last_health_check = time.time()
+
+            result = self.read_information() is not None
+
+            if(not result):
+                logging.warning("Sign health check failed, resetting connection")
+                with self.__lock:
+                    self.__disconnect()
+
+        return result
+
+    def read_information(self):
+        """read the sign information, such as the model and memory
+
+        :returns: the alphasign information object, None if it can't be read
+        """
+        result = None
+
+        with self.__lock:
+            if(self.__connect()):
+                try:
+                    result = self.__interface.read_information()
+                except Exception as ex:
+                    logging.error(f"Can't read sign information: {ex}")
+
+        return result
+
+    def wait_ready(self, timeout=15, interval=0.2):
+        """probe the sign until it answers, instead of waiting a fixed amount of time for it
+        to be ready. The sign handles commands in order so once it answers it has also finished
+        processing everything sent before, like clearing its memory.
+
+        :param timeout: max seconds to wait for the sign to answer
+        :param interval: seconds between each probe
+
+        :returns: the alphasign information object, None if the sign didn't answer in time
+        """
+        end = time.time() + timeout
+        result = self.read_information()
+
+        while(result is None and time.time() < end):
+            time.sleep(interval)
+            result = self.read_information()
+
+        return result
+
+    def write(self, obj):
+        """write an alphasign object or packet to the sign
+
+        :param obj: the alphasign object to write
+
+        :returns: True if the write was successful
+        """
+        return self.__call('write', obj)
+
+    def write_strings(self, objs):
+        """write several String objects in a single packet, the sign protocol allows more than one
+        command in a transmission with each separated by ETX STX
+
+        :param objs: list of alphasign String objects
+
+        :returns: True if the write was successful
+        """
+        separator = f"{alphasign.constants.ETX}{alphasign.constants.STX}"
+        contents = separator.join([f"{alphasign.constants.WRITE_STRING}{o.label}{o.data}" for o in objs])
+
+        return self.__call('write', alphasign.Packet(contents))
+
+    def allocate(self, objs):
+        """allocate memory for the given objects, see BaseInterface.allocate()
+
+        :returns: True if successful
+        """
+        return self.__call('allocate', objs)
+
+    def set_run_sequence(self, objs):
+        """set the run sequence of Text objects, see BaseInterface.set_run_sequence()
+
+        :returns: True if successful
+        """
+        return self.__call('set_run_sequence', objs)
+
+    def clear_memory(self):
+        """clear the sign memory, see BaseInterface.clear_memory()
+
+        :returns: True if successful
+        """
+        return self.__call('clear_memory')
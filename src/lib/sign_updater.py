@@ -0,0 +1,210 @@
+"""
+Copyright 2026 Rob Weber
+This file is part of ha-betabrite-sign
+omni-epd is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+import logging
+from termcolor import colored
+from . import codec, constants, metrics
+
+
+class SignUpdater:
+    """Takes new payloads and text for variables and updates the sign. Templates that depend
+    on a change are rendered, changed Strings are queued on the SignWriter, and the run sequence
+    is swapped when the active queue changes.
+
+    This is the update path shared by main.py and the SignSimulator, so the benchmark and replay
+    utilities measure the same code that runs on the sign.
+    """
+    active_queue = "main"  # default active queue at startup
+
+    __manager = None
+    __payload_manager = None
+    __writer = None
+    __metrics = None
+
+    def __init__(self, manager, payload_manager, writer, metrics=None):
+        """
+        :param manager: the MessageManager
+        :param payload_manager: the PayloadManager holding variable payloads
+        :param writer: the SignWriter to queue sign updates on
+        :param metrics: optional MetricsRegistry to count queue changes
+        """
+        self.__manager = manager
+        self.__payload_manager = payload_manager
+        self.__writer = writer
+        self.__metrics = metrics
+
+    def set_topic_payload(self, topic, payload):
+        """save a payload received on an MQTT topic for every variable subscribed to it,
+        then render them and any that depend on them
+
+        :param topic: the topic the payload was received on
+        :param payload: the payload string
+
+        :returns: the number of variables updated
+        """
+        mqttVars = self.__manager.get_variables_by_topic(topic)
+
+        # decode the payload once for each format used
+        decoded = {}
+        for aVar in mqttVars:
+            if(aVar.get_payload_format() not in decoded):
+                decoded[aVar.get_payload_format()] = codec.decode(payload, aVar.get_payload_format())
+
+            # save the new payload
+            self.__payload_manager.set_payload(aVar.get_name(), decoded[aVar.get_payload_format()])
+
+        # render these variables and any that depend on them
+        self.render_changed([aVar.get_name() for aVar in mqttVars])
+
+        return len(mqttVars)
+
+    def bulk_update(self, payload):
+        """Set the payloads of several variables at once. All payloads are applied before
+        anything is rendered and the sign writes are sent at the end, as one packet.
+
+        :param payload: JSON object of variable name: payload
+
+        :returns: the number of variables updated
+        """
+        try:
+            updates = json.loads(payload)
+        except ValueError as ex:
+            logging.error(f"Bulk update is not valid JSON: {ex}")
+            return 0
+
+        if(type(updates) is not dict):
+            logging.error("Bulk update must be a JSON object of variable: payload")
+            return 0
+
+        payloads = {}
+        for name, value in updates.items():
+            aVar = self.__manager.varObjs.get(name)
+
+            if(aVar is None or constants.JINJA_CATEGORY not in aVar.get_categories()):
+                logging.warning(f"Bulk update for {name} skipped, not a template variable")
+                continue
+
+            # strings are decoded the same as a message on the variable topic
+            payloads[name] = codec.decode(value, aVar.get_payload_format()) if type(value) is str else value
+
+        logging.debug(f"Bulk update of {len(payloads)} variables")
+
+        with self.__writer.batch():
+            self.__payload_manager.set_payloads(payloads)
+            self.render_changed(list(payloads.keys()))
+
+        return len(payloads)
+
+    def set_polled_payload(self, var, payload):
+        """save the result of polling a network variable, the variable isn't rendered
+        so several results can be rendered together with render_changed()
+
+        :param var: the REST or Home Assistant variable
+        :param payload: the response text, or rendered template for Home Assistant variables
+        """
+        if(var.get_type() == 'home_assistant'):
+            # the rendered template is shown as is
+            payload = payload.strip()
+            self.__payload_manager.set_payload(var.get_name(), payload)
+            self.update_string(var.get_name(), payload)
+        else:
+            self.__payload_manager.set_payload(var.get_name(), codec.decode(payload, var.get_payload_format()))
+
+    def poll(self, var):
+        """update a polling variable that doesn't need the network
+
+        :param var: the polling variable that is due
+
+        :returns: True if the variable has a template to render along with the other changes
+        """
+        if(constants.JINJA_CATEGORY in var.get_categories()):
+            # rendered with the other changes, this includes dynamic and timer variables
+            return True
+
+        # any other type, including those from other packages, gives its new text directly
+        newString = var.poll()
+        if(newString is not None):
+            self.update_string(var.get_name(), newString)
+
+        return False
+
+    def render_template(self, var):
+        """Render the Jinja variable and update the sign"""
+        if(self.__payload_manager.render_conditional(var.get_name(), var.update_template())):
+            # render the template
+            newString = self.__payload_manager.render_variable(var)
+
+            if(newString is not None):
+                # update the data on the sign if text has changed, placeholder text isn't used to size the String
+                self.update_string(var.get_name(), newString, self.__payload_manager.has_dependencies(var))
+        else:
+            logging.debug(f"update conditional not met for {var.get_name()}")
+
+    def render_changed(self, names):
+        """Render the given variables after their payloads have changed, along with every
+        variable that depends on them. Each variable is rendered once, after its dependencies.
+
+        :param names: list of variable names with new payloads
+        """
+        for name in self.__payload_manager.get_render_order(names):
+            var = self.__manager.get_variable_by_name(name)
+
+            # payload only variables, like home assistant, have nothing to render
+            if(constants.JINJA_CATEGORY in var.get_categories()):
+                self.render_template(var)
+
+    def update_string(self, name, msg, record=True):
+        """Update a string object on the sign
+
+        :param name: the name of the string to update, as defined in the yaml config
+        :param msg: the message to send to the sign
+        :param record: if the length of this message should be used to size the String, see MessageManager.update_string()
+        """
+        # replace some chars
+        msg = msg.replace('_', ' ')
+
+        strObj = self.__manager.update_string(name, msg, record)
+
+        # write to sign if this String exists
+        if(strObj is not None):
+            logging.debug(f"updated {name}:'{colored(constants.strip_control(msg), 'green')}'")
+            self.__writer.write(strObj)
+        else:
+            logging.debug(f"can't find allocated object for {name}")
+
+    def find_active_queue(self):
+        """finds the active queue based on the rules defined in the config file
+        and swaps the queue if necessary
+
+        :returns: True if the active queue changed
+        """
+        new_queue = self.__manager.find_active_queue(self.__payload_manager)
+
+        # nothing to do if it's the current one
+        if(new_queue == self.active_queue):
+            return False
+
+        # set the new run sequence
+        self.__writer.set_run_sequence(tuple(self.__manager.get_queue(new_queue)))
+        logging.info(f"loading message queue: {colored(new_queue, 'yellow')}")
+
+        if(self.__metrics is not None):
+            self.__metrics.inc(metrics.QUEUE_SWAPS)
+
+        # save the new queue name
+        self.active_queue = new_queue
+
+        return True
@@ -0,0 +1,298 @@
+"""
+Copyright 2026 Rob Weber
+This file is part of ha-betabrite-sign
+omni-epd is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import alphasign
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from . import metrics
+
+
+class SignWriter:
+    """Write-behind buffer for sign updates. Writes are queued by sign label and
+    written by a dedicated thread so callers never wait on the serial port. If a label is
+    written again before the first write is sent the newer object replaces it (last write wins).
+
+    Writes are split into priority lanes, a lane is only written once all higher priority
+    lanes are empty. This keeps the power state and queue changes from waiting behind string updates.
+    String writes waiting in the same lane, such as those released together by batch(), are sent to
+    the sign as one packet.
+
+    If a shadow (the MessageManager) is given writes are skipped when the sign already holds the same data.
+
+    A write that fails is put back at the front of its lane and tried again after a delay, or once
+    the connection is done backing off, unless a newer write to the same label was queued in the meantime.
+    """
+    LANE_STATE = 0  # sign on/off
+    LANE_QUEUE = 1  # run sequence changes
+    LANE_STRING = 2  # string and text updates
+
+    RUN_SEQUENCE = "run_sequence"  # key for run sequence writes
+    RETRY_DELAY = 1  # seconds to wait before trying a failed write again
+    MAX_PACKET_SIZE = 1024  # largest packet String writes are combined into
+
+    __connection = None
+    __shadow = None
+    __metrics = None
+    __lanes = None
+    __condition = None
+    __thread = None
+    __running = False
+    __in_flight = 0
+    __held = 0
+    __retry_at = 0
+
+    written = 0  # writes sent to the sign
+    sends = 0  # times the writer sent to the sign, combined String writes are sent once
+    coalesced = 0  # writes replaced by a newer write to the same label
+    retried = 0  # writes that failed and were queued again
+    dropped = 0  # writes never sent
+    skipped = 0  # writes not sent because the sign already has the data
+
+    def __init__(self, connection, shadow=None, metrics=None):
+        """
+        :param connection: the SignConnection to write to
+        :param shadow: object keeping track of sign memory, implementing shadow_matches() and update_shadow()
+        :param metrics: optional MetricsRegistry to record write times and bytes to
+        """
+        self.__connection = connection
+        self.__shadow = shadow
+        self.__metrics = metrics
+        self.__lanes = [OrderedDict(), OrderedDict(), OrderedDict()]
+        self.__condition = threading.Condition()
+
+    def start(self):
+        """start the writer thread"""
+        self.__running = True
+        self.__thread = threading.Thread(target=self.__run, name="SignWriter", daemon=True)
+        self.__thread.start()
+
+    def stop(self, timeout=5):
+        """stop the writer thread, pending writes are flushed first
+
+        :param timeout: max seconds to wait for pending writes
+        """
+        if(self.__thread is not None):
+            self.flush(timeout)
+
+            with self.__condition:
+                self.__running = False
+
+                # anything left over won't be sent
+                for lane in self.__lanes:
+                    self.dropped = self.dropped + len(lane)
+                    lane.clear()
+
+                self.__condition.notify_all()
+
+            self.__thread.join(timeout)
+            self.__thread = None
+
+    def flush(self, timeout=None):
+        """block until all pending writes have been sent
+
+        :param timeout: max seconds to wait, None waits forever
+
+        :returns: True if all writes were sent
+        """
+        with self.__condition:
+            return self.__condition.wait_for(lambda: self.__in_flight == 0 and not self.__has_pending(), timeout)
+
+    @contextmanager
+    def batch(self):
+        """hold back writes while a group of related updates is queued, when the block exits
+        they are sent together instead of the sign showing some of them before the rest are ready.
+        Writes to the same label within the block are coalesced as usual.
+        """
+        with self.__condition:
+            self.__held = self.__held + 1
+
+        try:
+            yield self
+        finally:
+            with self.__condition:
+                self.__held = self.__held - 1
+                self.__condition.notify_all()
+
+    def write(self, obj, lane=LANE_STRING):
+        """queue an alphasign object (String, Text) to be written to the sign
+
+        :param obj: the alphasign object
+        :param lane: the priority lane to use, LANE_STRING by default
+        """
+        self.__submit(lane, obj.label, 'write', obj, str(obj))
+
+    def retry(self, obj, lane=LANE_STRING):
+        """queue an alphasign object that failed to write outside of the writer, like during setup,
+        a write to the same label that is already queued is newer so it's kept instead
+
+        :param obj: the alphasign object
+        :param lane: the priority lane to use, LANE_STRING by default
+        """
+        with self.__condition:
+            if(any(obj.label in pending for pending in self.__lanes)):
+                return
+
+            self.__lanes[lane][obj.label] = ('write', obj, str(obj))
+            self.__condition.notify_all()
+
+    def set_run_sequence(self, objs):
+        """queue a change to the sign run sequence
+
+        :param objs: tuple of Text objects to set as the run sequence
+        """
+        self.__submit(self.LANE_QUEUE, self.RUN_SEQUENCE, 'set_run_sequence', objs, ''.join([o.label for o in objs]))
+
+    def get_stats(self):
+        """:returns: dict with the written, sends, coalesced, retried, dropped, skipped, and pending write counts"""
+        with self.__condition:
+            return {"written": self.written, "sends": self.sends, "coalesced": self.coalesced, "retried": self.retried,
+                    "dropped": self.dropped, "skipped": self.skipped, "pending": sum(len(lane) for lane in self.__lanes)}
+
+    def __submit(self, lane, key, func, arg, packet):
+        """add a write to the given lane, replacing any pending write with the same key"""
+        with self.__condition:
+            if(key in self.__lanes[lane]):
+                self.coalesced = self.coalesced + 1
+                logging.debug(f"coalesced pending sign write for {key}")
+
+            self.__lanes[lane][key] = (func, arg, packet)
+            self.__condition.notify_all()
+
+    def __has_pending(self):
+        return any(len(lane) > 0 for lane in self.__lanes)
+
+    def __can_write(self):
+        """:returns: True if there is a write to send and nothing is holding it back"""
+        return self.__has_pending() and self.__held == 0 and time.time() >= self.__retry_at
+
+    def __take(self):
+        """take the next writes to send from the highest priority lane. String writes next to each other
+        in the lane are taken together, up to MAX_PACKET_SIZE, so they can be sent in one packet.
+        Writes the sign already has are skipped.
+
+        :returns: tuple of the lane index and list of (key, entry) writes, the list is empty if all were skipped
+        """
+        result = []
+        size = 0
+
+        index = next(i for i in range(0, len(self.__lanes)) if len(self.__lanes[i]) > 0)
+        lane = self.__lanes[index]
+        while(len(lane) > 0):
+            key, (func, arg, packet) = next(iter(lane.items()))
+            combine = func == 'write' and isinstance(arg, alphasign.String)
+
+            if(len(result) > 0 and (not combine or size + len(packet) > self.MAX_PACKET_SIZE)):
+                break
+
+            lane.popitem(last=False)
+
+            if(self.__shadow is not None and self.__shadow.shadow_matches(key, packet)):
+                # sign already shows this, nothing to send
+                self.skipped = self.skipped + 1
+                continue
+
+            result.append((key, (func, arg, packet)))
+            size = size + len(packet)
+
+            if(not combine):
+                break
+
+        return index, result
+
+    def __send(self, writes):
+        """send the writes to the sign, several String writes are sent as a single packet
+
+        :returns: True if successful
+        """
+        if(len(writes) == 1):
+            key, (func, arg, packet) = writes[0]
+            return getattr(self.__connection, func)(arg)
+
+        return self.__connection.write_strings([arg for key, (func, arg, packet) in writes])
+
+    def __requeue(self, lane, key, entry):
+        """put a failed write back at the front of its lane, unless a newer write to the same label is waiting
+
+        :returns: True if the write was queued again
+        """
+        if(key in self.__lanes[lane]):
+            return False
+
+        self.__lanes[lane][key] = entry
+        self.__lanes[lane].move_to_end(key, last=False)
+        self.retried = self.retried + 1
+        self.__retry_at = time.time() + self.__get_retry_delay()
+
+        return True
+
+    def __get_retry_delay(self):
+        """:returns: seconds to wait before trying a failed write again, at least until the connection can reconnect"""
+        return max(self.RETRY_DELAY, self.__connection.get_retry_delay())
+
+    def __run(self):
+        """writer thread, sends pending writes to the sign in priority order"""
+        while(True):
+            with self.__condition:
+                while(self.__running and not self.__can_write()):
+                    # wait for a new write, or until a failed write can be tried again
+                    self.__condition.wait(max(self.__retry_at - time.time(), 0) if self.__retry_at > time.time() else None)
+
+                if(not self.__running):
+                    break
+
+                lane, writes = self.__take()
+
+                if(len(writes) == 0):
+                    self.__condition.notify_all()
+                    continue
+
+                self.__in_flight = self.__in_flight + 1
+
+            start = time.perf_counter()
+            success = self.__send(writes)
+            elapsed = time.perf_counter() - start
+            keys = ', '.join([key for key, entry in writes])
+
+            if(self.__metrics is not None):
+                self.__metrics.observe(metrics.SIGN_WRITE_SECONDS, elapsed)
+                if(success):
+                    self.__metrics.inc(metrics.SIGN_WRITE_BYTES, sum([len(packet) for key, (func, arg, packet) in writes]))
+                else:
+                    self.__metrics.inc(metrics.SIGN_WRITE_FAILURES)
+
+            with self.__condition:
+                self.__in_flight = self.__in_flight - 1
+
+                if(success):
+                    self.written = self.written + len(writes)
+                    self.sends = self.sends + 1
+                    logging.debug(f"wrote {keys} to sign in {elapsed * 1000:.1f}ms")
+
+                # requeue in reverse so failed writes keep their order at the front of the lane
+                for key, entry in reversed(writes):
+                    if(not success):
+                        if(self.__requeue(lane, key, entry)):
+                            logging.error(f"write to sign failed for {key}, trying again in {self.__retry_at - time.time():.0f} seconds")
+                        else:
+                            logging.error(f"write to sign failed for {key}, a newer write is already queued")
+
+                    if(self.__shadow is not None):
+                        # after a failure the sign contents are unknown
+                        self.__shadow.update_shadow(key, entry[2] if success else None)
+
+                self.__condition.notify_all()
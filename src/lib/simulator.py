@@ -0,0 +1,137 @@
+"""
+Copyright 2026 Rob Weber
+This file is part of ha-betabrite-sign
+omni-epd is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import alphasign
+import statistics
+from . import constants
+from .manager import MessageManager, PayloadManager
+from .sign_connection import SignConnection
+from .sign_updater import SignUpdater
+from .sign_writer import SignWriter
+
+
+def get_timings(samples):
+    """summarize a list of timings
+
+    :param samples: list of times in seconds
+
+    :returns: dict with the count, mean, percentiles and max in microseconds
+    """
+    samples = sorted(samples)
+
+    if(len(samples) == 0):
+        return {"count": 0}
+
+    return {"count": len(samples), "mean_us": round(statistics.mean(samples) * 1e6, 2),
+            "p50_us": round(samples[len(samples) // 2] * 1e6, 2),
+            "p95_us": round(samples[int(len(samples) * 0.95)] * 1e6, 2),
+            "p99_us": round(samples[int(len(samples) * 0.99)] * 1e6, 2),
+            "max_us": round(samples[-1] * 1e6, 2)}
+
+
+class CountingInterface(alphasign.interfaces.local.DebugInterface):
+    """DebugInterface that counts what would have been sent over the serial port"""
+    packets = 0
+    bytes = 0
+
+    def write(self, packet):
+        self.packets = self.packets + 1
+        self.bytes = self.bytes + len(str(packet))
+
+        return super().write(packet)
+
+
+class SignSimulator:
+    """Runs a layout file through the same update path as the main program, the SignUpdater, without
+    MQTT, Home Assistant or a real sign. Sign writes go to a CountingInterface. This is used by
+    the benchmark and replay utilities so they measure the real code.
+    """
+    manager = None
+    payload_manager = None
+    writer = None
+    updater = None
+
+    __interface = None
+    __connection = None
+
+    def __init__(self, layout):
+        """
+        :param layout: path to the layout yaml file
+        """
+        self.__interface = CountingInterface()
+        self.__connection = SignConnection(self.__interface)
+        self.manager = MessageManager(layout)
+
+    def startup(self):
+        """allocate the layout on the sign, start the writer, and load the templates"""
+        self.__connection.connect()
+        messages = self.manager.startup(self.__connection)
+
+        self.__connection.allocate(tuple(messages['allocate']))
+        self.__connection.set_run_sequence(tuple(messages['run']))
+        self.manager.update_shadow(SignWriter.RUN_SEQUENCE, ''.join([o.label for o in messages['run']]))
+
+        for obj in messages['allocate']:
+            if(self.__connection.write(obj)):
+                self.manager.update_shadow(obj.label, str(obj))
+
+        self.writer = SignWriter(self.__connection, self.manager)
+        self.writer.start()
+
+        self.payload_manager = PayloadManager(self.manager.get_variables_by_filter(constants.JINJA_CATEGORY),
+                                              self.manager.get_queue_templates())
+        self.updater = SignUpdater(self.manager, self.payload_manager, self.writer)
+
+    def stop(self):
+        """send any pending writes and close the connection"""
+        self.writer.stop()
+        self.__connection.close()
+
+    def on_message(self, topic, payload):
+        """handle a message on a variable topic or the bulk topic, same as main.mqtt_on_message()
+
+        :param topic: the MQTT topic
+        :param payload: the payload string
+
+        :returns: the number of variables updated
+        """
+        if(topic == constants.MQTT_BULK):
+            return self.updater.bulk_update(payload)
+
+        return self.updater.set_topic_payload(topic, payload)
+
+    def set_payload(self, name, payload):
+        """set a payload from a polling variable (REST, Home Assistant), same as main.poll()
+
+        :param name: the variable name
+        :param payload: the response text, or rendered template for Home Assistant variables
+        """
+        self.updater.set_polled_payload(self.manager.get_variable_by_name(name), payload)
+        self.updater.render_changed([name])
+
+    def tick(self, pollingVars):
+        """poll variables that don't need the network and check the active queue, same as the main loop
+
+        :param pollingVars: list of polling variables that are due
+        """
+        # REST and Home Assistant variables need the network, their results are given with set_payload()
+        changed = [v.get_name() for v in pollingVars if v.get_type() not in ['rest', 'home_assistant'] and self.updater.poll(v)]
+
+        self.updater.render_changed(changed)
+        self.updater.find_active_queue()
+
+    def get_stats(self):
+        """:returns: dict of sign writer stats and the packets and bytes sent to the sign"""
+        return self.writer.get_stats() | {"packets": self.__interface.packets, "bytes": self.__interface.bytes}
@@ -0,0 +1,104 @@
+"""
+Copyright 2026 Rob Weber
+This file is part of ha-betabrite-sign
+omni-epd is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+SNAPSHOT_VERSION = 1  # increase when the saved format changes, older files are ignored
+DATETIME_KEY = "__datetime__"  # marks an encoded datetime
+
+
+def _encode(obj):
+    """JSON encoder for values json can't handle, datetimes are kept so they can be decoded"""
+    if(isinstance(obj, datetime)):
+        return {DATETIME_KEY: obj.isoformat()}
+
+    return str(obj)
+
+
+def _decode(obj):
+    """JSON object hook that turns encoded datetimes back into datetime objects"""
+    if(len(obj) == 1 and DATETIME_KEY in obj):
+        return datetime.fromisoformat(obj[DATETIME_KEY])
+
+    return obj
+
+
+class SnapshotFile:
+    """Saves the state of the sign, such as variable payloads and rendered text, to a
+    file so it can be restored after a restart without waiting for each variable to update.
+
+    The file is compact JSON written to a temporary file and renamed over the old one,
+    so a crash while saving never leaves a partial snapshot. Saves where nothing has
+    changed since the last one are skipped.
+    """
+    path = None
+    __last = None  # the last data saved
+
+    def __init__(self, path):
+        """
+        :param path: the file to save the snapshot to
+        """
+        self.path = path
+
+    def save(self, data):
+        """save the data to the snapshot file, if it changed since the last save
+
+        :param data: dict of values to save, anything json can encode plus datetimes
+
+        :returns: True if the file was written
+        """
+        encoded = json.dumps(data, default=_encode, separators=(',', ':'), sort_keys=True)
+
+        if(encoded == self.__last):
+            return False
+
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, 'w') as f:
+                f.write(f'{{"version":{SNAPSHOT_VERSION},"saved":{time.time()},"data":{encoded}}}')
+
+            os.replace(tmp, self.path)
+            self.__last = encoded
+        except OSError as ex:
+            logging.error(f"Can't save snapshot {self.path}: {ex}")
+            return False
+
+        return True
+
+    def load(self):
+        """load the last saved snapshot
+
+        :returns: the saved data, None if there is no snapshot or it can't be read
+        """
+        result = None
+
+        if(os.path.exists(self.path)):
+            try:
+                with open(self.path, 'r') as f:
+                    snapshot = json.load(f, object_hook=_decode)
+
+                if(snapshot.get('version') == SNAPSHOT_VERSION):
+                    result = snapshot['data']
+                    logging.info(f"Loaded snapshot saved {datetime.fromtimestamp(snapshot['saved']):%m/%d %H:%M:%S}")
+                else:
+                    logging.warning(f"Snapshot {self.path} is from a different version, ignoring it")
+            except (OSError, ValueError, KeyError) as ex:
+                logging.warning(f"Can't read snapshot {self.path}, ignoring it: {ex}")
+
+        return result
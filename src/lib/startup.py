@@ -0,0 +1,90 @@
+"""
+Copyright 2026 Rob Weber
+This file is part of ha-betabrite-sign
+omni-epd is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+class StartupTimer:
+    """Times each step of startup so slow steps can be found in the log. Steps
+    that don't depend on each other can be run at the same time with parallel(), the
+    report then shows how long each one took along with the total time.
+    """
+    __start = None
+    __steps = None
+    __lock = None
+
+    def __init__(self):
+        self.__start = time.perf_counter()
+        self.__steps = []
+        self.__lock = threading.Lock()
+
+    @contextmanager
+    def step(self, name):
+        """time the code run within this context as a step
+
+        :param name: the name of the step for the report
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.__add(name, time.perf_counter() - start)
+
+    def mark(self, name):
+        """record a step that finished now, timed from the start of startup. Use this for
+        events that happen in the background, like a connection opening
+
+        :param name: the name of the step for the report
+        """
+        self.__add(name, time.perf_counter() - self.__start)
+
+    def parallel(self, steps):
+        """run the given steps at the same time, each on their own thread, and wait for all of them
+        to finish. If any step raises an exception it is raised here once all the steps are done
+
+        :param steps: dict of step name: function to run
+
+        :returns: dict of step name: return value of the function
+        """
+        def run(name, func):
+            with self.step(name):
+                return func()
+
+        with ThreadPoolExecutor(max_workers=len(steps), thread_name_prefix="startup") as executor:
+            futures = {name: executor.submit(run, name, func) for name, func in steps.items()}
+
+        return {name: f.result() for name, f in futures.items()}
+
+    def get_steps(self):
+        """:returns: list of (name, seconds) tuples in the order the steps finished"""
+        with self.__lock:
+            return list(self.__steps)
+
+    def get_total(self):
+        """:returns: seconds since startup began"""
+        return time.perf_counter() - self.__start
+
+    def get_report(self):
+        """:returns: a one line summary of the total time and each step"""
+        steps = ", ".join([f"{name} {seconds:.2f}s" for name, seconds in self.get_steps()])
+
+        return f"Startup took {self.get_total():.2f}s ({steps})"
+
+    def __add(self, name, seconds):
+        with self.__lock:
+            self.__steps.append((name, seconds))
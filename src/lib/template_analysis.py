@@ -0,0 +1,168 @@
+"""
+Copyright 2026 Rob Weber
+This file is part of ha-betabrite-sign
+omni-epd is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import jinja2
+import re
+from jinja2 import meta, nodes
+
+# template kinds
+STATIC = 'static'  # always renders the same thing
+PAYLOAD = 'payload'  # only changes when a variable payload changes
+TIME = 'time'  # changes with the current time
+
+# time granularities, finest first, with the cron expression to re-render at
+MINUTE = 'minute'
+HOUR = 'hour'
+DAY = 'day'
+MONTH = 'month'
+YEAR = 'year'
+GRANULARITY_CRON = {MINUTE: '* * * * *', HOUR: '0 * * * *', DAY: '0 0 * * *', MONTH: '0 0 1 * *', YEAR: '0 0 1 1 *'}
+
+# functions that read other variable payloads, the first argument is the variable name
+PAYLOAD_FUNCTIONS = ['get_payload', 'get_payload_attr', 'is_payload', 'is_payload_attr']
+
+# strftime codes and datetime attributes mapped to how often they change
+FORMAT_GRANULARITY = {MINUTE: 'MSfXcTRrs', HOUR: 'HIpkl', DAY: 'djaAwuxDeUWV', MONTH: 'mbBh', YEAR: 'yYCG'}
+ATTR_GRANULARITY = {'year': YEAR, 'month': MONTH, 'day': DAY, 'weekday': DAY, 'isoweekday': DAY, 'date': DAY, 'hour': HOUR}
+
+_env = jinja2.Environment()
+
+
+class TemplateInfo:
+    """Results of analyzing one or more templates"""
+    dependencies = None  # variable names read with the payload functions
+    uses_value = False  # True if the template uses its own payload
+    unknown_dependencies = False  # True if a payload function is called with a name that isn't a constant
+    granularity = None  # finest time granularity used, None if the template doesn't use the time
+
+    def __init__(self):
+        self.dependencies = []
+
+    def add_time(self, granularity):
+        """record a use of the current time, keeping the finest granularity"""
+        if(self.granularity is None or list(GRANULARITY_CRON).index(granularity) < list(GRANULARITY_CRON).index(self.granularity)):
+            self.granularity = granularity
+
+    def get_kind(self):
+        """:returns: STATIC, PAYLOAD, or TIME"""
+        result = STATIC
+
+        if(self.granularity is not None):
+            result = TIME
+        elif(self.uses_value or self.unknown_dependencies or len(self.dependencies) > 0):
+            result = PAYLOAD
+
+        return result
+
+    def get_cron(self):
+        """:returns: a cron expression for how often the template needs to be rendered, None if only on payload changes"""
+        result = None
+
+        if(self.granularity is not None):
+            result = GRANULARITY_CRON[self.granularity]
+        elif(self.unknown_dependencies):
+            # can't tell when this changes, check it every minute
+            result = GRANULARITY_CRON[MINUTE]
+
+        return result
+
+
+def analyze(*templates):
+    """parse the given templates and find the variables they depend on and how
+    they use the current time
+
+    :param templates: one or more Jinja template strings
+
+    :returns: a TemplateInfo object with the combined results
+    :raises TemplateSyntaxError: if a template can't be parsed
+    """
+    result = TemplateInfo()
+
+    for t in templates:
+        ast = _env.parse(t)
+
+        if('value' in meta.find_undeclared_variables(ast)):
+            result.uses_value = True
+
+        _visit(ast, [], result)
+
+    return result
+
+
+def _visit(node, parents, info):
+    """walk the template AST looking for payload and time functions
+
+    :param node: the current node
+    :param parents: list of the parent nodes, closest last
+    :param info: the TemplateInfo to update
+    """
+    if(isinstance(node, nodes.Call) and isinstance(node.node, nodes.Name)):
+        name = node.node.name
+
+        if(name in PAYLOAD_FUNCTIONS):
+            if(len(node.args) > 0 and isinstance(node.args[0], nodes.Const) and isinstance(node.args[0].value, str)):
+                if(node.args[0].value not in info.dependencies):
+                    info.dependencies.append(node.args[0].value)
+            else:
+                info.unknown_dependencies = True
+        elif(name == 'now'):
+            info.add_time(_now_granularity(parents))
+        elif(name == 'is_time' and len(node.args) < 3 and 'current_time' not in [k.key for k in node.kwargs]):
+            # without a time to compare against is_time() uses the current time
+            info.add_time(_format_granularity(node.args[1] if len(node.args) > 1 else None))
+
+    for child in node.iter_child_nodes():
+        _visit(child, parents + [node], info)
+
+
+def _now_granularity(parents):
+    """work out how now() is used, such as now().year or now().strftime('%m')
+
+    :param parents: list of the parents of the now() call, closest last
+
+    :returns: the time granularity
+    """
+    result = MINUTE
+
+    if(len(parents) > 0 and isinstance(parents[-1], nodes.Getattr)):
+        attr = parents[-1].attr
+
+        if(attr == 'strftime' and len(parents) > 1 and isinstance(parents[-2], nodes.Call) and len(parents[-2].args) > 0):
+            result = _format_granularity(parents[-2].args[0])
+        elif(attr in ATTR_GRANULARITY):
+            result = ATTR_GRANULARITY[attr]
+
+    return result
+
+
+def _format_granularity(node):
+    """find the finest strftime code in a format string
+
+    :param node: the AST node of the format argument
+
+    :returns: the time granularity, MINUTE if the format isn't a constant
+    """
+    if(node is None or not isinstance(node, nodes.Const) or not isinstance(node.value, str)):
+        return MINUTE
+
+    result = None
+    codes = re.findall('%-?(.)', node.value)
+
+    for g in reversed(list(FORMAT_GRANULARITY)):
+        if(any(c in FORMAT_GRANULARITY[g] for c in codes)):
+            result = g
+
+    # unknown codes could be anything
+    return result if result is not None else MINUTE
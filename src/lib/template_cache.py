@@ -0,0 +1,112 @@
+"""
+Copyright 2026 Rob Weber
+This file is part of ha-betabrite-sign
+omni-epd is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class TemplateCache:
+    """Caches compiled Jinja templates keyed on the template source string.
+    Templates defined in the layout file are compiled once and pinned so they
+    are never evicted, any other template strings are kept in a bounded LRU cache
+
+    If a Jinja BytecodeCache is given pinned templates are loaded from it instead of being
+    compiled, and saved to it when they are compiled.
+    """
+    __env = None
+    __bytecode_cache = None
+    __pinned = None
+    __lru = None
+    __lock = None
+    max_size = 0
+    hits = 0
+    misses = 0
+
+    def __init__(self, env, max_size=64, bytecode_cache=None):
+        """
+        :param env: the jinja2 Environment used to compile templates
+        :param max_size: the max number of ad-hoc (not pinned) templates to keep
+        :param bytecode_cache: optional jinja2 BytecodeCache to keep compiled pinned templates in
+        """
+        self.__env = env
+        self.__bytecode_cache = bytecode_cache
+        self.__pinned = {}
+        self.__lru = OrderedDict()
+        self.__lock = threading.Lock()
+        self.max_size = max_size
+
+    def pin(self, template_str):
+        """compile a template and keep it for the life of the cache
+
+        :param template_str: the jinja template string
+        """
+        with self.__lock:
+            if(template_str not in self.__pinned):
+                # move from the LRU cache if it was already compiled
+                template = self.__lru.pop(template_str, None)
+                if(template is None):
+                    template = self.__load(template_str)
+
+                self.__pinned[template_str] = template
+
+    def get(self, template_str):
+        """get the compiled template for this string, compiling it if needed
+
+        :param template_str: the jinja template string
+
+        :returns: a compiled jinja2 Template object
+        """
+        with self.__lock:
+            template = self.__pinned.get(template_str)
+
+            if(template is None and template_str in self.__lru):
+                # mark as most recently used
+                self.__lru.move_to_end(template_str)
+                template = self.__lru[template_str]
+
+            if(template is not None):
+                self.hits = self.hits + 1
+            else:
+                self.misses = self.misses + 1
+                template = self.__env.from_string(template_str)
+                self.__lru[template_str] = template
+
+                # evict the least recently used template
+                if(len(self.__lru) > self.max_size):
+                    self.__lru.popitem(last=False)
+
+        return template
+
+    def __load(self, template_str):
+        """compile a template, using the bytecode cache if there is one"""
+        if(self.__bytecode_cache is None):
+            return self.__env.from_string(template_str)
+
+        # templates have no name, use a hash of the source for the cache entry
+        name = hashlib.sha1(template_str.encode('utf-8')).hexdigest()
+        bucket = self.__bytecode_cache.get_bucket(self.__env, name, None, template_str)
+
+        if(bucket.code is None):
+            bucket.code = self.__env.compile(template_str)
+            self.__bytecode_cache.set_bucket(bucket)
+
+        return self.__env.template_class.from_code(self.__env, bucket.code, self.__env.make_globals(None), None)
+
+    def get_stats(self):
+        """:returns: a dict with the cache hits, misses, and number of compiled templates"""
+        with self.__lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "pinned": len(self.__pinned), "cached": len(self.__lru)}
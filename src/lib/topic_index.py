@@ -0,0 +1,85 @@
+"""
+Copyright 2026 Rob Weber
+This file is part of ha-betabrite-sign
+omni-epd is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+class TopicIndex:
+    """Index of MQTT topic subscriptions to values (usually variables)
+    Exact topics are found with a single dict lookup, topics using the MQTT
+    single (+) or multi level (#) wildcards are stored in a trie split on the topic levels.
+    More than one value can be registered to the same topic.
+    """
+    __exact = None
+    __wildcards = None
+    __has_wildcards = False
+
+    def __init__(self):
+        self.__exact = {}
+        self.__wildcards = _TopicNode()
+
+    def add(self, topic, value):
+        """register a value for the given topic subscription
+
+        :param topic: the MQTT topic, can contain wildcards
+        :param value: the value to return when a topic matches
+        """
+        if('+' in topic or '#' in topic):
+            node = self.__wildcards
+            for level in topic.split('/'):
+                node = node.children.setdefault(level, _TopicNode())
+            node.values.append(value)
+
+            self.__has_wildcards = True
+        else:
+            self.__exact.setdefault(topic, []).append(value)
+
+    def match(self, topic):
+        """find all values registered to subscriptions matching this topic
+
+        :param topic: the topic a message was published to (no wildcards)
+
+        :returns: a list of values, blank list if there are no matches
+        """
+        result = list(self.__exact.get(topic, []))
+
+        if(self.__has_wildcards):
+            levels = topic.split('/')
+
+            # topics starting with $ are reserved and do not match wildcards at the first level
+            self.__match_node(self.__wildcards, levels, 0, not topic.startswith('$'), result)
+
+        return result
+
+    def __match_node(self, node, levels, index, wildcards_allowed, result):
+        """recursively walk the trie collecting values that match the given topic levels"""
+        if(wildcards_allowed and '#' in node.children):
+            # multi level wildcard matches this level and everything below it
+            result.extend(node.children['#'].values)
+
+        if(index == len(levels)):
+            result.extend(node.values)
+        else:
+            if(levels[index] in node.children):
+                self.__match_node(node.children[levels[index]], levels, index + 1, True, result)
+
+            if(wildcards_allowed and '+' in node.children):
+                self.__match_node(node.children['+'], levels, index + 1, True, result)
+
+
+class _TopicNode:
+    """a single level in the wildcard topic trie"""
+
+    def __init__(self):
+        self.children = {}
+        self.values = []
@@ -23,9 +23,26 @@ class HomeAssistantVariable(PollingVariable):
 
     Special configuration options are:
       * template: the home assistant template to render
+      * timeout: seconds to wait for Home Assistant to respond, default is 10
+      * stream: True to get updates pushed over the Home Assistant WebSocket API, default is False
     """
     def __init__(self, name, config):
         super().__init__('home_assistant', name, config)
 
+    def get_default_config(self):
+        result = super().get_default_config()
+
+        # add defaults for this class
+        result['timeout'] = 10
+        result['stream'] = False
+
+        return result
+
+    def get_timeout(self):
+        return self.config['timeout']
+
+    def is_streaming(self):
+        return self.config['stream']
+
     def get_text(self):
         return self.config['template']
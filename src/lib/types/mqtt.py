@@ -62,6 +62,9 @@ class MQTTPushVariable(MQTTVariable):
     def should_retain(self):
         return self.config['retain']
 
+    def get_templates(self):
+        return super().get_templates() + [self.should_update_topic(), self.update_topic()]
+
     def get_categories(self):
         return [constants.MQTT_CATEGORY, constants.JINJA_CATEGORY, constants.MQTT_PUSH_CATEGORY]
 
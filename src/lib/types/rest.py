@@ -13,9 +13,9 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-import requests
 import unicodedata
 from .. import constants
+from .. http_cache import HttpCache
 from .. variable_type import JinjaVariable, PollingVariable
 
 
@@ -27,33 +27,64 @@ class RestVariable(JinjaVariable, PollingVariable):
     Special configuration options are:
       * url: the home assistant template to render
       * method: GET or POST
+      * timeout: seconds to wait for a response, default is 10
+      * cache: True to use HTTP caching headers to skip unchanged responses, default is True
     """
+    __cache = None
+
     def __init__(self, name, config):
         super().__init__('rest', name, config)
 
+        # only GET requests can be cached
+        if(self.config['cache'] and self.config['method'].lower() == 'get'):
+            self.__cache = HttpCache()
+
     def get_default_config(self):
         result = super().get_default_config()
 
         # add defaults for this class
         result['method'] = 'get'
+        result['timeout'] = 10
+        result['cache'] = True
 
         return result
 
-    def poll(self):
+    def poll(self, client):
+        """make the HTTP request for this variable
+
+        :param client: the HttpClient to use for the request
+
+        :returns: the response text, blank if the request was not successful, None if it has not changed since the last poll
+        """
         result = ''
 
+        if(self.__cache is not None and self.__cache.is_fresh()):
+            # last response hasn't expired yet
+            return None
+
         # make the request based on the method given
         if(self.config['method'].lower() == 'get'):
-            response = requests.get(self.config['url'])
+            headers = self.__cache.get_headers() if self.__cache is not None else {}
+            response = client.get(self.config['url'], headers=headers, timeout=self.get_timeout())
         else:
-            response = requests.post(self.config['url'])
+            response = client.post(self.config['url'], timeout=self.get_timeout())
 
-        if(response.status_code == 200):
+        if(self.__cache is not None and self.__cache.update(response)):
+            # 304, the last payload is still current
+            result = None
+        elif(response.status_code == 200):
             # successful request
             result = unicodedata.normalize('NFD', response.text)
 
         return result
 
+    def get_timeout(self):
+        return self.config['timeout']
+
+    def get_cache_stats(self):
+        """:returns: the HTTP cache stats for this variable, None if caching is off"""
+        return self.__cache.get_stats() if self.__cache is not None else None
+
     def get_text(self):
         return self.config['template']
 
@@ -13,7 +13,9 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import logging
 from .. import constants
+from .. import template_analysis
 from .. variable_type import AlphaSignVariable, JinjaVariable, PollingVariable
 
 
@@ -21,15 +23,19 @@ class DynamicVariable(JinjaVariable, PollingVariable):
     """Variable type that holds dynamic text
     This is typically combined from other variable types
 
-    Template content is rendered once per minute (polling) or when variables referenced
-    in the template are changed
+    Template content is rendered when variables referenced in the template are changed. Templates
+    using the current time, like now() or is_time(), are also rendered as often as the time
+    they use changes (every minute, hour, day, etc)
     """
     def __init__(self, name, config):
         super().__init__('dynamic', name, config)
 
-        # set the cron time to be at midnight each day
+        # the schedule depends on how the templates use the time, None if they don't
         # this not changeable so set after defaults merged
-        self.config['cron'] = '*/1 * * * *'
+        info = template_analysis.analyze(self.get_text(), self.update_template())
+        self.config['cron'] = info.get_cron()
+
+        logging.debug(f"{name} is a {info.get_kind()} template, schedule: {self.config['cron']}")
 
     def get_categories(self):
         return [constants.POLLING_CATEGORY, constants.JINJA_CATEGORY]
@@ -85,6 +85,15 @@ class TimeVariable(AlphaSignVariable):
 
         return timeObj
 
+    def get_sign_object(self):
+        return self.get_text()
+
+    def get_sign_setup(self):
+        timeObj = self.get_text()
+
+        # set the clock format and the current time
+        return [timeObj.set_format(self.get_time_format()), timeObj.set()]
+
     def get_startup(self):
         format = "%I:%M%p" if self.get_time_format() == 0 else "%H:%M"
         return datetime.now().strftime(format)
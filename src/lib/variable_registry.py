@@ -0,0 +1,161 @@
+"""
+Copyright 2026 Rob Weber
+This file is part of ha-betabrite-sign
+omni-epd is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import importlib
+import logging
+from importlib.metadata import entry_points
+
+# entry point group other packages can use to add variable types
+ENTRY_POINT_GROUP = "ha_betabrite_sign.variables"
+
+# built in variable types, module (relative to this package) and class name
+BUILTIN_TYPES = {"date": ".types.time:DateVariable",
+                 "dynamic": ".types.text:DynamicVariable",
+                 "home_assistant": ".types.home_assistant:HomeAssistantVariable",
+                 "mqtt": ".types.mqtt:MQTTVariable",
+                 "mqtt_push": ".types.mqtt:MQTTPushVariable",
+                 "rest": ".types.rest:RestVariable",
+                 "static": ".types.text:StaticVariable",
+                 "time": ".types.time:TimeVariable",
+                 "timer": ".types.mqtt:TimerVariable"}
+
+
+class VariableRegistry:
+    """Looks up the class for each variable type by the type name used in the layout file.
+    The module for a type is only imported the first time a variable of that type is
+    created, so layouts only load the code for the types they use.
+
+    Other packages can add types by defining an entry point in the ha_betabrite_sign.variables
+    group, named for the type and pointing at a class extending VariableType. Options these
+    types accept are added to the layout schema from the class schema attribute. Entry points
+    are only looked up once a type that isn't built in is needed.
+    """
+    __types = None  # type name: module path or entry point
+    __classes = None  # type name: loaded class
+    __scanned = False  # if the entry points of other packages have been loaded
+
+    def __init__(self):
+        self.__types = dict(BUILTIN_TYPES)
+        self.__classes = {}
+        self.__scanned = False
+
+    def __scan(self):
+        """add the types defined by other packages, this reads the metadata of every
+        installed package so is only done once, and only when needed"""
+        if(self.__scanned):
+            return
+
+        self.__scanned = True
+
+        eps = entry_points()
+        eps = eps.select(group=ENTRY_POINT_GROUP) if hasattr(eps, 'select') else eps.get(ENTRY_POINT_GROUP, [])
+
+        for ep in eps:
+            if(ep.name in self.__types):
+                logging.warning(f"Variable type {ep.name} from {ep.value} is already defined, skipping it")
+            else:
+                self.__types[ep.name] = ep
+
+    def register(self, name, cls):
+        """add a variable type directly, replacing any existing type with this name
+
+        :param name: the type name used in the layout file
+        :param cls: the class to create variables of this type with
+        """
+        self.__types[name] = cls
+        self.__classes[name] = cls
+
+    def get_types(self):
+        """:returns: a sorted list of all type names, including those added by other packages"""
+        self.__scan()
+
+        return sorted(self.__types.keys())
+
+    def is_builtin(self, name):
+        """:returns: True if this is one of the built in types, which are already in the layout schema"""
+        return self.__types.get(name) == BUILTIN_TYPES.get(name)
+
+    def get_class(self, name):
+        """get the class for a variable type, importing its module if needed
+
+        :param name: the type name
+
+        :returns: the class for this type
+
+        :raises UnknownVariableTypeError: if there is no type with this name
+        """
+        if(name not in self.__classes):
+            if(name not in self.__types):
+                self.__scan()
+
+            if(name not in self.__types):
+                raise UnknownVariableTypeError(name)
+
+            source = self.__types[name]
+            if(isinstance(source, str)):
+                module, cls = source.split(':')
+                self.__classes[name] = getattr(importlib.import_module(module, __package__), cls)
+            else:
+                # entry point
+                self.__classes[name] = source.load()
+
+        return self.__classes[name]
+
+    def create(self, type, name, config):
+        """create a variable
+
+        :param type: the type name
+        :param name: the name of the variable
+        :param config: the variable config from the layout file
+
+        :returns: the new variable object
+        """
+        return self.get_class(type)(name, config)
+
+    def update_schema(self, schema, types):
+        """update the variables section of the layout schema so it allows each registered type,
+        and any options used by the given types that aren't built in
+
+        :param schema: the full layout schema, updated in place
+        :param types: the type names used in the layout
+        """
+        varSchema = schema['variables']['valueschema']['schema']
+
+        # other packages are only searched if the layout uses a type that isn't already known
+        if(any(t is not None and t not in self.__types for t in types)):
+            self.__scan()
+
+        varSchema['type']['allowed'] = sorted(self.__types.keys())
+
+        for t in types:
+            if(t not in self.__types or self.is_builtin(t)):
+                continue
+
+            for option, rules in (self.get_class(t).schema or {}).items():
+                if(option not in varSchema):
+                    varSchema[option] = dict(rules, dependencies={"type": []})
+
+                # existing options are only allowed for the types listed
+                if('dependencies' in varSchema[option]):
+                    varSchema[option]['dependencies']['type'].append(t)
+
+
+class UnknownVariableTypeError(Exception):
+    """This error is thrown when a variable type isn't a built in type or
+    added by an installed package
+    """
+
+    def __init__(self, typeName):
+        super().__init__(f"The variable type '{typeName}' is not defined")
@@ -14,10 +14,17 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 import logging
-import re
-from croniter import croniter
 from datetime import datetime
 from . import constants
+from . import template_analysis
+
+
+def _croniter(expression, start_time):
+    """create a croniter object, croniter is only imported once a variable is polled
+    as it's slow to load and not needed by every layout"""
+    from croniter import croniter
+
+    return croniter(expression, start_time)
 
 
 class VariableType:
@@ -29,6 +36,10 @@ class VariableType:
     name = None
     config = None
 
+    # layout options for types added by other packages, option name: Cerberus rules
+    # options already in the schema only need an empty dict to allow them for the type
+    schema = None
+
     def __init__(self, type, name, config):
         """
         :param type: the type of variable, unique to subclasses
@@ -93,6 +104,18 @@ class VariableType:
 
         return result
 
+    def get_sign_object(self):
+        """variables the sign keeps up to date itself, like the time, use a built in alphasign object
+        in messages instead of a String holding their text
+
+        :returns: the alphasign object, None if this variable is shown with a String
+        """
+        return None
+
+    def get_sign_setup(self):
+        """:returns: a list of packets to write to the sign before the object from get_sign_object() is used"""
+        return []
+
     def get_categories(self):
         """the categories of this variable, implemented by subclasses"""
         raise NotImplementedError
@@ -126,12 +149,16 @@ class PollingVariable(VariableType):
         compare against, usually the current time (datetime.now())
         :param offset: timedelta representing the offset to subtract from current time
 
-        :returns: True/False if the variable should be updated
+        :returns: True/False if the variable should be updated, always True if there is no cron expression
         """
+        if(self.config['cron'] is None):
+            # only polled on startup
+            return True
+
         result = False
 
         # base the next update on the offset as the start time
-        cron = croniter(self.config['cron'], current_time - offset)
+        cron = _croniter(self.config['cron'], current_time - offset)
         nextUpdate = cron.get_next(datetime)
 
         if(nextUpdate <= current_time):
@@ -139,6 +166,25 @@ class PollingVariable(VariableType):
 
         return result
 
+    def get_schedule(self, start_time):
+        """creates an iterator over the polling times for this variable based
+        on the configured cron expression
+
+        :param start_time: a datetime object to start the schedule from
+
+        :returns: a croniter object, call get_next() to get the next polling time, None if there is no cron expression
+        """
+        return _croniter(self.config['cron'], start_time) if self.config['cron'] is not None else None
+
+    def poll(self):
+        """get the new text for this variable when it's due to be polled. REST, Home Assistant, and
+        template variables are updated from their payloads instead. This runs on the main
+        thread so types added by other packages should return quickly
+
+        :returns: the new text to show on the sign, None if nothing has changed
+        """
+        return self.get_text()
+
     def get_categories(self):
         return [constants.POLLING_CATEGORY]
 
@@ -161,6 +207,7 @@ class JinjaVariable(VariableType):
     Special configuration options are:
       * template: what to render on the sign
       * update_template: eval True/False if this template should be updated
+      * payload_format: how incoming payloads are decoded (auto, json, number, text)
     """
     __depends = None
 
@@ -168,14 +215,7 @@ class JinjaVariable(VariableType):
         super().__init__(type, name, config)
 
         # get variables this var depends on based on 'get_payload' or 'is_payload' type functions
-        # uses matching per description https://docs.python.org/3/library/re.html#re.findall
-        self.__depends = []
-        matches = re.findall("(is_payload(_attr)?\('(\w+)',)|(get_payload(_attr)?\('(\w+)'(,)?)", self.get_text())  # noqa: W605
-        for m in matches:
-            # will be in group 2 or 5
-            depend = m[2] if m[2] != '' else m[5]
-            if(depend not in self.__depends):
-                self.__depends.append(depend)
+        self.__depends = template_analysis.analyze(self.get_text()).dependencies
 
         if(len(self.__depends) > 0):
             logging.debug(f"{name} dependencies: {self.__depends}")
@@ -186,6 +226,13 @@ class JinjaVariable(VariableType):
     def update_template(self):
         return self.config['update_template']
 
+    def get_payload_format(self):
+        return self.config['payload_format']
+
+    def get_templates(self):
+        """:returns: a list of all template strings used by this variable"""
+        return [self.get_text(), self.update_template()]
+
     def get_text(self):
         return self.config['template']
 
@@ -225,5 +272,9 @@ class StatefulVariable(PollingVariable):
         """ returns the value of a current state key """
         return self._states[name]
 
+    def get_states(self):
+        """ returns a copy of the states dictionary """
+        return dict(self._states)
+
     def get_categories(self):
         return [constants.POLLING_CATEGORY, constants.STATEFUL_CATEGORY]
@@ -16,28 +16,53 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import configargparse
 import json
 import logging
+import os
+import re
 import signal
 import sys
 import threading
 import time
 import alphasign
+from concurrent.futures import ThreadPoolExecutor
 import paho.mqtt.client as mqtt
-import paho.mqtt.subscribe as mqtt_subscribe
 from datetime import datetime, timedelta
 from slugify import slugify
 from termcolor import colored
 from lib.manager import MessageManager, PayloadManager
-from lib.home_assistant import HomeAssistant
-from lib import constants
+from lib.recorder import EventRecorder, HA_EVENT, MQTT_EVENT, REST_EVENT
+from lib.layout_cache import LayoutCache
+from lib.memory_planner import MemoryPlanner, SignMemoryError
+from lib.scheduler import PollScheduler
+from lib.sign_connection import SignConnection
+from lib.sign_updater import SignUpdater
+from lib.sign_writer import SignWriter
+from lib.snapshot import SnapshotFile
+from lib.startup import StartupTimer
+from lib import constants, metrics
+from lib.metrics import MetricsRegistry, MetricsServer
+from lib.profiler import SamplingProfiler
 
 # create global vars
-active_queue = "main"  # default active queue at startup
 betabrite_info = None
-betabrite = None
+betabrite = None  # SignConnection to the alphasign interface
+homeA = None  # HomeAssistant interface
+layout_cache = None  # compiled copy of the layout, if enabled
+ha_stream = None  # HomeAssistant WebSocket connection for streaming variables
+http_client = None  # shared HTTP connection pool
 manager = None
+metrics_registry = None  # runtime metrics
+metrics_server = None  # serves metrics over HTTP, if enabled
 mqtt_client = None
 payload_manager = None
-thread_lock = threading.Lock()  # ensure exclusive access to betabrite serial port
+poll_executor = None  # thread pool for polling network variables
+profiler = None  # sampling profiler started from the command topic
+recorder = None  # records events for replay, if enabled
+scheduler = None
+sign_writer = None  # buffers writes to the sign
+snapshot = None  # saves variable data for restarts, if enabled
+startup = None  # times each step of startup
+updater = None  # renders variable updates and queues them on the sign writer
+ready = threading.Event()  # set once everything MQTT messages need has been loaded
 
 
 def signal_handler(signum, frame):
@@ -52,6 +77,30 @@ def signal_handler(signum, frame):
         mqtt_client.loop_stop()
         mqtt_client.disconnect()
 
+    if(ha_stream is not None):
+        ha_stream.stop()
+
+    if(poll_executor is not None):
+        poll_executor.shutdown(wait=False)
+        http_client.close()
+
+    if(snapshot is not None and payload_manager is not None):
+        save_snapshot()
+
+    if(sign_writer is not None):
+        # send anything still pending
+        sign_writer.stop()
+        logging.debug(f"Sign writes: {sign_writer.get_stats()}")
+
+    if(betabrite is not None):
+        betabrite.close()
+
+    if(recorder is not None):
+        recorder.close()
+
+    if(metrics_server is not None):
+        metrics_server.stop()
+
     sys.exit(0)
 
 
@@ -59,6 +108,29 @@ def mqtt_connect(client, userdata, flags, rc):
     """run on successful mqtt connection"""
     logging.info("Connected to MQTT Server")
 
+    if(not ready.is_set()):
+        # the connection is opened while the sign and layout are loading
+        startup.mark("mqtt connect")
+        ready.wait()
+
+    # subscribe to the built in topics, and the last known sign status
+    watchTopics = [(constants.MQTT_SWITCH, 1), (constants.MQTT_COMMAND, 1), (constants.MQTT_BULK, 1), (constants.MQTT_NEW_TEXT, 1),
+                   (constants.MQTT_TIMER_STATUS, 1), (constants.MQTT_TIMER_COMMAND, 1),
+                   (constants.MQTT_TIMER_TEXT, 1), (constants.MQTT_TIMER_NEW_TEXT, 1),
+                   (constants.MQTT_TIMER_EVENT, 1), (constants.MQTT_STATUS, 1)]
+
+    # get a list of all mqtt variables
+    mqttVars = manager.get_variables_by_filter(constants.MQTT_CATEGORY)
+    for v in mqttVars:
+        watchTopics.append((v.get_topic(), v.get_qos()))
+
+    # subscribe to the topics
+    mqtt_client.subscribe(watchTopics)
+
+    # let HA know we're online
+    mqtt_client.publish(constants.MQTT_AVAILABLE, "online", retain=True)
+    mqtt_publish_attributes()
+
     device_name_slug = slugify(args.ha_device_name, separator='_')
 
     if(args.ha_discovery):
@@ -67,13 +139,17 @@ def mqtt_connect(client, userdata, flags, rc):
 
         # device discovery payload - https://www.home-assistant.io/integrations/mqtt/#discovery-payload
         payload = {"device": {"name": args.ha_device_name, "identifiers": device_name_slug,
-                              "hw_version": betabrite_info.get_firmware(), 'model': betabrite_info.get_model(),
                               "manufacturer": "Alpha-American"},
                    "origin": {"name": constants.PROJECT_NAME, "sw_version": constants.PROJECT_VERSION,
                               "support_url": "https://github.com/robweber/ha-betabrite-sign"},
                    "availability_topic": constants.MQTT_AVAILABLE,
                    "components": {}}
 
+        # the sign information is missing if the sign didn't answer on startup
+        if(betabrite_info is not None):
+            payload['device']['hw_version'] = betabrite_info.get_firmware()
+            payload['device']['model'] = betabrite_info.get_model()
+
         # generate the light entity config https://www.home-assistant.io/integrations/light.mqtt/
         payload['components'][f"{device_name_slug}_light"] = {"name": f"{args.ha_device_name} Light", "platform": constants.MQTT_DISCOVERY_LIGHT_CLASS,  # noqa
                                                               "default_entity_id": f"light.{device_name_slug}_light",  "unique_id": f"light.{device_name_slug}_light",  # noqa
@@ -117,10 +193,33 @@ def mqtt_connect(client, userdata, flags, rc):
         mqtt_client.publish(topic, "", retain=True)
 
 
+def get_subscription(topic):
+    """finds the subscribed topic a message arrived on, used as the metrics label so
+    wildcard subscriptions count as one label instead of one per topic
+
+    :param topic: the topic a message was received on
+
+    :returns: the topic pattern of the matching variables, or the topic itself for built in topics
+    """
+    mqttVars = manager.get_variables_by_topic(topic)
+
+    if(len(mqttVars) == 0):
+        # built in topics are subscribed to directly
+        return topic
+
+    return min(v.get_topic() for v in mqttVars)
+
+
 def mqtt_on_message(client, userdata, message):
     """triggered when message is received via mqtt"""
+    ready.wait()
     logging.debug(f"Sub { colored(message.topic, 'red') }: {str(message.payload) }")
 
+    if(recorder is not None):
+        recorder.record(MQTT_EVENT, message.topic, message.payload.decode('utf-8', errors='replace'))
+
+    metrics_registry.inc(metrics.MQTT_MESSAGES, topic=get_subscription(message.topic))
+
     # sign on/off
     if(message.topic == constants.MQTT_SWITCH):
         change_state(str(message.payload.decode('utf-8')))
@@ -129,9 +228,20 @@ def mqtt_on_message(client, userdata, message):
         mqtt_client.publish(constants.MQTT_STATUS, message.payload, retain=True)
         mqtt_publish_attributes()
 
+    elif(message.topic == constants.MQTT_STATUS):
+        # the retained status from before startup, only needed once
+        mqtt_client.unsubscribe(constants.MQTT_STATUS)
+
+        logging.info(f"Startup state is: {colored(str(message.payload.decode('utf-8')), 'yellow')}")
+        change_state(str(message.payload.decode('utf-8')))
+
     elif(message.topic == constants.MQTT_COMMAND):
         # format is {command:"", params: {}}  noqa: E800
-        payload = json.loads(message.payload.decode('utf-8'))
+        try:
+            payload = json.loads(message.payload.decode('utf-8'))
+            run_command(payload['command'], payload.get('params', {}))
+        except Exception as ex:
+            logging.error(f"Invalid command: {ex}")
 
     # timer switch
     elif(message.topic == constants.MQTT_TIMER_COMMAND):
@@ -159,6 +269,7 @@ def mqtt_on_message(client, userdata, message):
 
             # update internal state
             manager.update_variable_state(aVar.get_name(), "running", True)
+            scheduler.wake(aVar.get_name())
         else:
             logging.debug("Stopping timer")
 
@@ -174,15 +285,20 @@ def mqtt_on_message(client, userdata, message):
 
             # update the running variable
             manager.update_variable_state(aVar.get_name(), "running", False)
+            scheduler.wake(aVar.get_name())
 
         # update the payload and render - must do this right away as timer starts/stops now
         payload_manager.set_payload(aVar.get_name(), payload)
 
-        render_template(aVar)
+        updater.render_changed([aVar.get_name()])
 
         # publish new status
         mqtt_client.publish(constants.MQTT_TIMER_STATUS, message.payload, retain=True)
 
+    # bulk update - payloads for several variables in one message
+    elif(message.topic == constants.MQTT_BULK):
+        updater.bulk_update(message.payload.decode('utf-8'))
+
     # text object
     elif(message.topic == constants.MQTT_NEW_TEXT):
         # republish into state topic
@@ -213,32 +329,15 @@ def mqtt_on_message(client, userdata, message):
         # set the timer state
         manager.update_variable_state(aVar.get_name(), 'timer', {'hours': hours, "minutes": minutes})
     else:
-        # this is for a variable, load it
-        aVar = manager.get_variable_by_filter(constants.MQTT_CATEGORY, lambda v: v.get_topic() == message.topic)
-
-        if(aVar is not None):
-            payload = str(message.payload.decode('utf-8'))
-
-            # decode if payload is json
-            if(constants.is_json(payload)):
-                payload = json.loads(payload)
-
-            # save the new payload
-            payload_manager.set_payload(aVar.get_name(), payload)
-
-            # render this variable
-            render_template(aVar)
-
-            # re-render any dependant variables
-            for dep in payload_manager.get_dependencies(aVar.get_name()):
-                render_template(manager.get_variable_by_name(dep))
+        # this is for one or more variables, save the payload and render them
+        updater.set_topic_payload(message.topic, message.payload.decode('utf-8'))
 
 
 def mqtt_publish_attributes():
     # make sure MQTT is setup
     if(mqtt_client is not None):
         attributes = {"last_updated": str(datetime.now().astimezone().isoformat(timespec='seconds')),
-                      "active_queue": active_queue,
+                      "active_queue": updater.active_queue,
                       "device_ip": constants.get_local_ip()}
 
         mqtt_client.publish(constants.MQTT_ATTRIBUTES,
@@ -246,6 +345,147 @@ def mqtt_publish_attributes():
                             retain=True)
 
 
+def mqtt_publish_command_result(command, result):
+    """publish the result of a command sent to the command topic"""
+    if(mqtt_client is not None):
+        mqtt_client.publish(constants.MQTT_COMMAND_RESULT, json.dumps({"command": command, "result": result}))
+
+
+def get_number_param(params, name, default, min_value, max_value):
+    """get a number from the command parameters, limited to the given range
+
+    :param params: dict of command parameters
+    :param name: the parameter name
+    :param default: the value to use if the parameter isn't given
+    :param min_value: the smallest value allowed
+    :param max_value: the largest value allowed
+
+    :returns: the value, None if it isn't a number
+    """
+    value = params.get(name, default)
+
+    if(isinstance(value, bool) or not isinstance(value, (int, float))):
+        logging.error(f"Command parameter {name} must be a number: {value}")
+        return None
+
+    return min(max(value, min_value), max_value)
+
+
+def run_command(command, params):
+    """run an operations command sent to the command topic, results are published to the command result topic
+
+    :param command: the name of the command
+    :param params: dict of parameters for the command
+    """
+    global profiler
+    logging.info(f"Running command: {colored(command, 'yellow')} {params}")
+
+    if(command == 'profile'):
+        if(profiler is not None and profiler.is_running()):
+            mqtt_publish_command_result(command, {"error": "profiler is already running"})
+            return
+
+        # only a file name is accepted, profiles are always saved in the profile directory
+        name = params.get('name', f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.txt")
+        if(not isinstance(name, str) or re.fullmatch(r"[\w-][\w.-]*", name) is None):
+            logging.error(f"Invalid profile file name: {name}")
+            mqtt_publish_command_result(command, {"error": "name must be a file name without a directory"})
+            return
+
+        seconds = get_number_param(params, 'seconds', 30, 1, 600)
+        interval = get_number_param(params, 'interval_ms', 5, 1, 1000)
+        top = get_number_param(params, 'top', 25, 1, 500)
+        if(None in [seconds, interval, top]):
+            mqtt_publish_command_result(command, {"error": "seconds, interval_ms, and top must be numbers"})
+            return
+
+        os.makedirs(constants.PROFILE_DIR, exist_ok=True)
+        path = os.path.join(constants.PROFILE_DIR, name)
+        top = int(top)
+
+        def profile_done(p):
+            with open(path, 'w') as f:
+                f.write(p.get_report(top))
+
+            logging.info(f"Profile saved to {path}")
+            mqtt_publish_command_result(command, {"path": path, "samples": p.samples, "top": p.get_top(top)})
+
+        profiler = SamplingProfiler(interval / 1000)
+        profiler.start(seconds, profile_done)
+    elif(command == 'profile_stop'):
+        if(profiler is not None):
+            profiler.stop()
+    elif(command == 'slow_templates'):
+        threshold = get_number_param(params, 'threshold_ms', 0, 0, 60000)
+        if(threshold is None):
+            mqtt_publish_command_result(command, {"error": "threshold_ms must be a number"})
+            return
+
+        payload_manager.set_slow_threshold(threshold / 1000 if threshold > 0 else None)
+        mqtt_publish_command_result(command, {"threshold_ms": threshold})
+    elif(command == 'render_all'):
+        # resend everything, even if the sign should already have it
+        payload_manager.clear_rendered()
+        manager.clear_shadow()
+        jinjaVars = manager.get_variables_by_filter(constants.JINJA_CATEGORY)
+        updater.render_changed([v.get_name() for v in jinjaVars])
+        mqtt_publish_command_result(command, {"variables": len(jinjaVars)})
+    else:
+        mqtt_publish_command_result(command, {"error": "unknown command"})
+
+
+def save_snapshot():
+    """save variable payloads, rendered text and states so they can be restored after a restart"""
+    data = payload_manager.get_snapshot()
+    data['states'] = {v.get_name(): v.get_states() for v in manager.get_variables_by_filter(constants.STATEFUL_CATEGORY)}
+    data['lengths'] = manager.get_observed_lengths()
+
+    if(snapshot.save(data)):
+        logging.debug(f"Saved snapshot to {snapshot.path}")
+
+
+def restore_snapshot(data):
+    """restore variable payloads, rendered text and states saved before a restart
+
+    :param data: the saved snapshot, see save_snapshot()
+
+    :returns: dict of variable name: text to load on the sign at startup
+    """
+    # skip variables no longer in the layout
+    dropped = {name for name in list(data['payloads']) + list(data['states']) if name not in manager.varObjs}
+    if(len(dropped) > 0):
+        logging.warning(f"Snapshot variables no longer in the layout, skipping them: {', '.join(sorted(dropped))}")
+
+    data['payloads'] = {name: p for name, p in data['payloads'].items() if name in manager.varObjs}
+
+    for name, states in data['states'].items():
+        if(name not in manager.varObjs):
+            continue
+
+        for state, value in states.items():
+            manager.update_variable_state(name, state, value)
+
+    result = payload_manager.restore(data)
+
+    # home assistant variables show their payload as is
+    for v in manager.get_variables_by_filter(constants.POLLING_CATEGORY, lambda v: v.get_type() == 'home_assistant'):
+        if(isinstance(data['payloads'].get(v.get_name()), str)):
+            result[v.get_name()] = data['payloads'][v.get_name()]
+
+    logging.info(f"Restored {len(result)} variables from the snapshot")
+
+    return {name: text.replace('_', ' ') for name, text in result.items()}
+
+
+def mqtt_publish_metrics():
+    """publish a summary of the runtime metrics"""
+    if(mqtt_client is not None):
+        summary = metrics_registry.to_dict()
+        summary['template_cache'] = payload_manager.get_cache_stats()
+
+        mqtt_client.publish(constants.MQTT_METRICS, json.dumps(summary), retain=True)
+
+
 def mqtt_push():
     """ Determine if any MQTT push variables should update content """
     # check mqtt is setup
@@ -262,102 +502,239 @@ def mqtt_push():
                 mqtt_client.publish(aVar.get_topic(), payload, retain=aVar.should_retain())
 
 
-def render_template(var):
-    """Render the Jinja variable and update the sign"""
-    if(payload_manager.render_conditional(var.get_name(), var.update_template())):
-        # render the template
-        newString = payload_manager.render_variable(var)
+def wait_for_sign():
+    """wait for the sign to finish processing everything sent to it so far,
+    the CLI interface is always ready
 
-        if(newString is not None):
-            # update the data on the sign if text has changed
-            update_string(var.get_name(), newString)
-    else:
-        logging.debug(f"update conditional not met for {var.get_name()}")
+    :returns: the sign information, None for the CLI or if the sign doesn't answer
+    """
+    result = None
+
+    if(args.device != 'cli'):
+        result = betabrite.wait_ready()
+
+        if(result is None):
+            logging.warning("Sign did not answer, continuing startup anyway")
 
+    return result
 
-def setup():
-    """Setup the sign by allocating memory for variables and messages"""
-    # connect to the sign and clear memory
+
+def open_sign():
+    """Connect to the sign and wait for it to answer
+
+    :returns: the sign information, see wait_for_sign()
+    """
     betabrite.connect()
+    result = wait_for_sign()
+
+    if(result is not None):
+        logging.debug(colored(f"Connected to: {result.get_firmware()}", "red"))
+
+    return result
+
+
+def clear_sign():
+    """Clear the sign memory, only done once the layout is known to be valid
+
+    :returns: the sign information after clearing, see wait_for_sign()
+    """
     betabrite.clear_memory()
 
-    # wait for operation to complete
-    time.sleep(2)
+    # the sign answers once the memory is clear
+    return wait_for_sign()
+
+
+def load_payloads(saved):
+    """Create the payload manager and restore any saved snapshot
+
+    :param saved: the snapshot data, None if there isn't one
+
+    :returns: tuple of the text to load on the sign (None to use the startup text) and the MemoryPlanner
+    """
+    global payload_manager
+    payload_manager = PayloadManager(manager.get_variables_by_filter(constants.JINJA_CATEGORY), manager.get_queue_templates(), metrics_registry,
+                                     layout_cache.get_bytecode_cache() if layout_cache is not None else None)
+
+    if(saved is None):
+        return None, MemoryPlanner()
+
+    text = restore_snapshot(saved)
+
+    # size strings from the longest text seen before the restart, including the restored text
+    # unless it's a placeholder from a template rendered before its dependencies had payloads
+    lengths = {name: length for name, length in saved.get('lengths', {}).items() if name in manager.varObjs}
+    for name, restored in text.items():
+        aVar = manager.get_variable_by_name(name)
+        if(constants.JINJA_CATEGORY not in aVar.get_categories() or payload_manager.has_dependencies(aVar)):
+            lengths[name] = max(len(restored), lengths.get(name, 0))
+
+    return text, MemoryPlanner(lengths)
 
-    messages = manager.startup(betabrite)
+
+def setup(messages):
+    """Setup the sign by allocating memory for variables and messages
+
+    :param messages: the objects to allocate, from MessageManager.startup()
+    """
+    manager.clear_shadow()
 
     logging.info('allocating and sending run sequence')
 
     betabrite.allocate(tuple(messages['allocate']))
     betabrite.set_run_sequence(tuple(messages['run']))
+    manager.update_shadow(SignWriter.RUN_SEQUENCE, ''.join([o.label for o in messages['run']]))
 
-    # write each object to the sign
+    # write each object to the sign, keeping track of what the sign holds
     for obj in messages['allocate']:
-        betabrite.write(obj)
+        if(betabrite.write(obj)):
+            manager.update_shadow(obj.label, str(obj))
+        else:
+            # replayed by the writer once the sign can be reached
+            sign_writer.retry(obj)
 
-    betabrite.disconnect()
+    # wait for everything to be loaded before sending updates
+    wait_for_sign()
 
     logging.info(f"loading message queue: {colored('main', 'yellow')}")
 
 
-def poll(offset=timedelta(seconds=10)):
-    """Gets all polling type variables and checks if they need updating
+def ha_stream_update(name, result):
+    """triggered when the Home Assistant stream sends a new result for a variable"""
+    ready.wait()
+
+    if(recorder is not None):
+        recorder.record(HA_EVENT, name, result)
+
+    updater.set_polled_payload(manager.get_variable_by_name(name), result)
+
+    # render any dependant variables
+    updater.render_changed([name])
 
-    :param offset: the offset to use when calculating the next update time, 10 seconds is the default otherwise the next time will never happen
+
+def ha_stream_connection(connected):
+    """triggered when the Home Assistant stream connects or disconnects"""
+    if(not connected):
+        # poll streaming variables right away, they're polled normally until the stream reconnects
+        for v in manager.get_variables_by_filter(constants.POLLING_CATEGORY, lambda v: v.get_type() == 'home_assistant' and v.is_streaming()):
+            scheduler.wake(v.get_name())
+
+
+def fetch_home_assistant(haVars):
+    """Renders the templates for all given Home Assistant variables with a single request
+    this is run in the poll thread pool
+
+    :param haVars: list of Home Assistant variables
+
+    :returns: dict of variable name: rendered template or TemplateSyntaxError
     """
-    # get all polling type variables that need to be updated
-    now = datetime.now()
-    pollingVars = manager.get_variables_by_filter(constants.POLLING_CATEGORY, lambda v: v.should_poll(now, offset))
+    templates = {v.get_name(): v.get_text() for v in haVars}
 
-    # load the HA interface, if needed
-    homeA = None
-    if(args.ha_url and args.ha_token):
-        homeA = HomeAssistant(args.ha_url, args.ha_token)
+    start = time.perf_counter()
+    try:
+        return homeA.render_templates(templates, max([v.get_timeout() for v in haVars]))
+    finally:
+        # each variable waited on the whole request
+        for v in haVars:
+            metrics_registry.observe(metrics.POLL_SECONDS, time.perf_counter() - start, variable=v.get_name())
 
-    for v in pollingVars:
-        logging.info(f"Polling {v.get_name()}")
 
-        # update based on the type
-        newString = None
-        if(v.get_type() == 'date'):
-            newString = v.get_text()
-        elif(v.get_type() == 'rest'):
-            # attempt to get new data
-            payload = v.poll()
+def poll_rest(var):
+    """Makes the HTTP request for a REST variable, this is run in the poll thread pool
 
-            # decode if payload is json
-            if(constants.is_json(payload)):
-                payload = json.loads(payload)
+    :param var: the REST variable
 
-            # save the new payload
-            payload_manager.set_payload(v.get_name(), payload)
+    :returns: the response text, see RestVariable.poll()
+    """
+    start = time.perf_counter()
+    try:
+        return var.poll(http_client)
+    finally:
+        metrics_registry.observe(metrics.POLL_SECONDS, time.perf_counter() - start, variable=var.get_name())
 
-            # render this variable
-            render_template(v)
 
-            # re-render any dependant variables
-            for dep in payload_manager.get_dependencies(v.get_name()):
-                render_template(manager.get_variable_by_name(dep))
+def poll(pollingVars):
+    """Updates the given polling type variables. Network requests for all variables
+    are started in parallel, results are processed on the calling thread.
 
-        elif(v.get_type() == 'dynamic'):
-            # render this variable
-            render_template(v)
-        elif(v.get_type() == "timer"):
-            render_template(v)
+    :param pollingVars: list of polling variables that are due to be updated
+    """
+    # start any network requests
+    pending = {}
+    for v in pollingVars:
+        if(v.get_type() == 'rest'):
+            pending[v.get_name()] = poll_executor.submit(poll_rest, v)
+
+    # variables updated by the stream don't need to be polled
+    if(ha_stream is not None and ha_stream.is_connected()):
+        pollingVars = [v for v in pollingVars if not (v.get_type() == 'home_assistant' and v.is_streaming())]
+
+    # home assistant templates are rendered together
+    haRequest = None
+    haVars = [v for v in pollingVars if v.get_type() == 'home_assistant']
+    if(len(haVars) > 0 and homeA is not None):
+        haRequest = poll_executor.submit(fetch_home_assistant, haVars)
+
+    # variables with new payloads, rendered together at the end
+    changed = []
+    for v in pollingVars:
+        logging.info(f"Polling {v.get_name()}")
+
+        # update based on the type
+        if(v.get_type() == 'rest'):
+            # wait for the new data
+            try:
+                payload = pending[v.get_name()].result()
+            except Exception as ex:
+                logging.error(f"Error polling {v.get_name()}: {ex}")
+                metrics_registry.inc(metrics.POLL_FAILURES, variable=v.get_name())
+                continue
+
+            if(v.get_cache_stats() is not None):
+                logging.debug(f"{v.get_name()} HTTP cache: {v.get_cache_stats()}")
+
+            if(payload is None):
+                # response hasn't changed, nothing to update
+                logging.debug(f"{v.get_name()} has not changed since the last poll")
+                continue
+
+            if(recorder is not None):
+                recorder.record(REST_EVENT, v.get_name(), payload)
+
+            # save the new payload
+            updater.set_polled_payload(v, payload)
+            changed.append(v.get_name())
         elif(v.get_type() == 'home_assistant'):
             if(homeA is not None):
                 try:
-                    # render the template in home assistant, save the result
-                    newString = homeA.render_template(v.get_text()).strip()
-                    payload_manager.set_payload(v.get_name(), newString)
+                    # get the rendered template, save the result
+                    result = haRequest.result()[v.get_name()]
+
+                    if(isinstance(result, Exception)):
+                        raise result
+
+                    if(recorder is not None):
+                        recorder.record(HA_EVENT, v.get_name(), result)
+
+                    updater.set_polled_payload(v, result)
+                    changed.append(v.get_name())
                 except Exception as ex:
                     logging.error(ex)
+                    metrics_registry.inc(metrics.POLL_FAILURES, variable=v.get_name())
 
             else:
                 logging.error("Home Assistant interface is not loaded, specify HA url and token to load")
+        elif(updater.poll(v)):
+            # templates are rendered with the other changes
+            changed.append(v.get_name())
+
+    # render the updated variables and anything that depends on them
+    updater.render_changed(changed)
 
-        if(newString is not None):
-            update_string(v.get_name(), newString)
+    if(len(pending) > 0 or haRequest is not None):
+        logging.debug(f"HTTP connections: {http_client.get_stats()}")
+
+    if(len(changed) > 0):
+        logging.debug(f"Template cache: {payload_manager.get_cache_stats()}")
 
 
 def change_state(newState):
@@ -366,71 +743,21 @@ def change_state(newState):
 
     :param newState: the new state of the sign (ON/OFF)
     """
-    thread_lock.acquire()
-    betabrite.connect()
-
     # create the sign object and update the sign
     if(newState == constants.MQTT_SWITCH_OFF):
         offMessage = manager.update_text(constants.SIGN_OFF, ' ', True)
     else:
         offMessage = manager.update_text(constants.SIGN_OFF, '', True)
 
-    betabrite.write(offMessage)
-    betabrite.disconnect()
-    thread_lock.release()
+    sign_writer.write(offMessage, SignWriter.LANE_STATE)
 
 
 def find_active_queue():
-    """finds the active queue based on the rules defined in the config file
-    and swaps the queue if necessary
-    """
-    global active_queue
-    new_queue = manager.find_active_queue(payload_manager)
-
-    # swap the queue if it's not the current one
-    if(new_queue != active_queue):
-        queue_list = manager.get_queue(new_queue)
-
-        thread_lock.acquire()
-        betabrite.connect()
-
-        # set the new run sequence
-        betabrite.set_run_sequence(tuple(queue_list))
-        logging.info(f"loading message queue: {colored(new_queue, 'yellow')}")
-
-        betabrite.disconnect()
-        thread_lock.release()
-
-        # save the new queue name
-        active_queue = new_queue
+    """swaps the sign to the active queue, if it changed, and publishes the new queue name"""
+    if(updater.find_active_queue()):
         mqtt_publish_attributes()
 
 
-def update_string(name, msg):
-    """Update a string object on the sign
-
-    :param name: the name of the string to update, as defined in the yaml config
-    :param msg: the message to send to the sign
-    """
-    # replace some chars
-    msg = msg.replace('_', ' ')
-
-    strObj = manager.update_string(name, msg)
-
-    # write to sign if this String exists
-    if(strObj is not None):
-        logging.debug(f"updated {name}:'{colored(constants.strip_control(msg), 'green')}'")
-        thread_lock.acquire()
-        betabrite.connect()
-
-        betabrite.write(strObj)
-
-        betabrite.disconnect()
-        thread_lock.release()
-    else:
-        logging.debug(f"can't find allocated object for {name}")
-
-
 # parse the arguments
 parser = configargparse.ArgumentParser(description='Home Assistant Betabrite Sign')
 parser.add_argument('-c', '--config', is_config_file=True,
@@ -441,6 +768,12 @@ parser.add_argument('-d', '--device', default="/dev/ttyUSB0",
                     help="Path to device where Alphasign is connected, default is %(default)s, can also use 'cli' to output to screen only")
 parser.add_argument('-D', '--debug', action='store_true',
                     help='Enables logging debug mode')
+parser.add_argument('--cache_dir', required=False,
+                    help="Directory to keep a compiled copy of the layout in to start faster, disabled by default")
+parser.add_argument('--snapshot', required=False,
+                    help="Save variable data to this file and restore it on startup so the sign shows the last known values right away")
+parser.add_argument('--snapshot_interval', type=int, default=60,
+                    help="Seconds between saving the snapshot file, default is %(default)s")
 
 # ha polling args
 haGroup = parser.add_argument_group("Home Assistant", "Settings required for Home Assistant polling")
@@ -464,6 +797,22 @@ mqttGroup.add_argument('--ha_device_name', default="Betabrite Sign",
 mqttGroup.add_argument('--mqtt_discovery_prefix', default="homeassistant",
                        help="The Home Assistant MQTT Discovery Prefix, default is '%(default)s'")
 
+# polling args
+pollGroup = parser.add_argument_group("Polling", "Settings for polling variables")
+pollGroup.add_argument('--poll_catch_up', default=PollScheduler.CATCH_UP_ONCE, choices=[PollScheduler.CATCH_UP_ONCE, PollScheduler.CATCH_UP_SKIP],
+                       help="How polls missed while busy are handled, run them once or skip them, default is %(default)s")
+
+# debugging args
+debugGroup = parser.add_argument_group("Debugging", "Settings for troubleshooting and performance testing")
+debugGroup.add_argument('--metrics_port', type=int, required=False,
+                        help="Serve runtime metrics in the Prometheus format on this port, disabled by default")
+debugGroup.add_argument('--metrics_host', default='127.0.0.1',
+                        help="Address the metrics server listens on, use 0.0.0.0 to allow other machines to scrape it, default is %(default)s")
+debugGroup.add_argument('--metrics_interval', type=int, default=60,
+                        help="Seconds between publishing metrics to the MQTT metrics topic, 0 to disable, default is %(default)s")
+debugGroup.add_argument('--record', required=False,
+                        help="Record MQTT messages and polling results to this file to replay with replay.py, use a .gz extension to compress")
+
 args = parser.parse_args()
 
 # add hooks for interrupt signal
@@ -486,38 +835,24 @@ logging.debug('Debug Mode On')
 
 logging.info(colored(f"Starting {constants.PROJECT_NAME} - Version {constants.PROJECT_VERSION}", "red"))
 
+if(args.record):
+    recorder = EventRecorder(args.record)
+
+metrics_registry = MetricsRegistry()
+if(args.metrics_port):
+    metrics_server = MetricsServer(metrics_registry, args.metrics_port, args.metrics_host)
+    metrics_server.start()
+
 if(args.device == 'cli'):
-    betabrite = alphasign.interfaces.local.DebugInterface()
+    betabrite = SignConnection(alphasign.interfaces.local.DebugInterface())
     logging.info(colored('Connected to: CLI', 'red'))
 else:
-    betabrite = alphasign.interfaces.local.Serial(device=args.device)
-
-    # get some basic sign info
-    betabrite.connect()
-    betabrite_info = betabrite.read_information()
-    betabrite.disconnect()
-
-    logging.debug(colored(f"Connected to: {betabrite_info.get_firmware()}", "red"))
-
-logging.info("Loading layout: " + args.layout)
-manager = MessageManager(args.layout)
-
-setup()
-
-# sleep for a few seconds
-time.sleep(10)
+    # keep the serial connection open, probe it periodically
+    betabrite = SignConnection(alphasign.interfaces.local.Serial(device=args.device), health_check=True)
 
-# setup the payload manager
-payload_manager = PayloadManager(manager.get_variables_by_filter(constants.JINJA_CATEGORY))
+startup = StartupTimer()
 
 if(args.mqtt and args.mqtt_username):
-
-    # get the last known sign status from MQTT
-    statusMsg = mqtt_subscribe.simple(constants.MQTT_STATUS, hostname=args.mqtt,
-                                      auth={"username": args.mqtt_username, "password": args.mqtt_password})
-    logging.info(f"Startup state is: {colored(str(statusMsg.payload.decode('utf-8')), 'yellow')}")
-    change_state(str(statusMsg.payload.decode('utf-8')))
-
     # setup the MQTT connection
     mqtt_client = mqtt.Client()
     mqtt_client.username_pw_set(args.mqtt_username, args.mqtt_password)
@@ -529,44 +864,109 @@ if(args.mqtt and args.mqtt_username):
     # set last will in case of crash
     mqtt_client.will_set(constants.MQTT_AVAILABLE, "offline", qos=1, retain=True)
 
-    mqtt_client.connect(args.mqtt)
+    # connect in the background, topics are subscribed once startup is ready for messages
+    mqtt_client.connect_async(args.mqtt)
+    mqtt_client.loop_start()
+else:
+    logging.info("No MQTT server or username, skipping MQTT setup")
 
-    # subscribe to the built in topics
-    watchTopics = [(constants.MQTT_SWITCH, 1), (constants.MQTT_COMMAND, 1), (constants.MQTT_NEW_TEXT, 1),
-                   (constants.MQTT_TIMER_STATUS, 1), (constants.MQTT_TIMER_COMMAND, 1),
-                   (constants.MQTT_TIMER_TEXT, 1), (constants.MQTT_TIMER_NEW_TEXT, 1),
-                   (constants.MQTT_TIMER_EVENT, 1)]
+# clear the sign while the layout is loaded
+logging.info("Loading layout: " + args.layout)
+if(args.snapshot):
+    snapshot = SnapshotFile(args.snapshot)
 
-    # get a list of all mqtt variables
-    mqttVars = manager.get_variables_by_filter(constants.MQTT_CATEGORY)
-    for v in mqttVars:
-        watchTopics.append((v.get_topic(), v.get_qos()))
+if(args.cache_dir):
+    layout_cache = LayoutCache(args.cache_dir)
 
-    # subscribe to the topics
-    mqtt_client.subscribe(watchTopics)
+loaded = startup.parallel({"sign": open_sign, "layout": lambda: MessageManager(args.layout, layout_cache),
+                           "snapshot": lambda: snapshot.load() if snapshot is not None else None})
+manager = loaded['layout']
 
-    # starts the network loop in the background
-    mqtt_client.loop_start()
+# the layout is valid, clear the sign while the templates are loaded
+cleared = startup.parallel({"clear": clear_sign, "payloads": lambda: load_payloads(loaded['snapshot'])})
+betabrite_info = cleared['clear'] if cleared['clear'] is not None else loaded['sign']
 
-    # let HA know we're online
-    mqtt_client.publish(constants.MQTT_AVAILABLE, "online", retain=True)
-    mqtt_publish_attributes()
-else:
-    logging.info("No MQTT server or username, skipping MQTT setup")
+with startup.step("objects"):
+    # load the sign with the text from before the restart, if there is any
+    startText, planner = cleared['payloads']
+    messages = manager.startup(betabrite, startText, planner)
+    logging.info(f"Layout needs {planner.get_total(messages['allocate'])} bytes of sign memory")
+
+    # make sure everything fits before writing anything, kill the program if it doesn't
+    if(betabrite_info is not None):
+        try:
+            planner.check(messages['allocate'], betabrite_info.get_free_memory(), manager.get_label_names())
+        except SignMemoryError as ex:
+            logging.error(str(ex))
+            sys.exit(2)
+
+    # setup the polling schedule
+    scheduler = PollScheduler(manager.get_variables_by_filter(constants.POLLING_CATEGORY), catch_up=args.poll_catch_up)
+
+    # threads and connections to poll network variables, the HTTP libraries are only loaded if the layout uses them
+    haVars = manager.get_variables_by_filter(constants.POLLING_CATEGORY, lambda v: v.get_type() == 'home_assistant')
+    if(len(haVars) > 0 or len(manager.get_variables_by_filter(constants.POLLING_CATEGORY, lambda v: v.get_type() == 'rest')) > 0):
+        from lib.http_client import HttpClient
+
+        poll_executor = ThreadPoolExecutor(max_workers=manager.get_setting('poll_workers'), thread_name_prefix="poll")
+        http_client = HttpClient(pool_size=manager.get_setting('poll_workers'))
 
-# go one day backward on first load (ie, force polling)
-poll(timedelta(days=1))
+    # load the HA interface, if needed
+    if(len(haVars) > 0 and args.ha_url and args.ha_token):
+        from lib.home_assistant import HomeAssistant
+
+        homeA = HomeAssistant(args.ha_url, args.ha_token, http_client)
+
+# start the writer thread for sign updates
+sign_writer = SignWriter(betabrite, manager, metrics_registry)
+sign_writer.start()
+updater = SignUpdater(manager, payload_manager, sign_writer, metrics_registry)
+
+# hold all sign writes until the sign is setup and the first poll is done
+with sign_writer.batch():
+    # MQTT messages can be handled now, anything they write is sent once the sign is setup
+    ready.set()
+
+    # start the stream for any variables that get updates pushed from HA, its updates go through the sign writer
+    if(homeA is not None):
+        streamVars = manager.get_variables_by_filter(constants.POLLING_CATEGORY, lambda v: v.get_type() == 'home_assistant' and v.is_streaming())
+        if(len(streamVars) > 0):
+            from lib.home_assistant_stream import HomeAssistantStream
+
+            ha_stream = HomeAssistantStream(args.ha_url, args.ha_token, {v.get_name(): v.get_text() for v in streamVars},
+                                            ha_stream_update, ha_stream_connection)
+            ha_stream.start()
 
+    # go one day backward on first load (ie, force polling) while the sign is loaded
+    now = datetime.now()
+    firstPoll = manager.get_variables_by_filter(constants.POLLING_CATEGORY, lambda v: v.should_poll(now, timedelta(days=1)))
+    startup.parallel({"sign setup": lambda: setup(messages), "first poll": lambda: poll(firstPoll)})
+
+logging.info(startup.get_report())
+
+next_metrics = time.time() + args.metrics_interval
+next_snapshot = time.time() + args.snapshot_interval
 while 1:
-    # sleep for 10 seconds
+    # sleep until a variable needs polling or the next 10 second tick
     logging.debug('sleeping')
-    time.sleep(10 - (datetime.now().second % 10))
+    pollingVars = scheduler.wait()
 
     # check polling variables
-    poll()
+    poll(pollingVars)
 
     # check for mqtt push variables
     mqtt_push()
 
     # check if active queue has changed
     find_active_queue()
+
+    # make sure the sign is still responding
+    betabrite.check_health()
+
+    if(args.metrics_interval > 0 and time.time() >= next_metrics):
+        mqtt_publish_metrics()
+        next_metrics = time.time() + args.metrics_interval
+
+    if(snapshot is not None and time.time() >= next_snapshot):
+        save_snapshot()
+        next_snapshot = time.time() + args.snapshot_interval
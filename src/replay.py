@@ -0,0 +1,148 @@
+"""
+Copyright 2026 Rob Weber
+This file is part of ha-betabrite-sign
+omni-epd is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import json
+import logging
+import time
+from termcolor import colored
+from lib import constants
+from lib.recorder import read_events, HA_EVENT, MQTT_EVENT, REST_EVENT
+from lib.simulator import SignSimulator, get_timings
+
+# seconds of recorded time between checks of the active queue, same as the main loop
+TICK_INTERVAL = 10
+
+
+class EventReplay:
+    """Replays a recording made with the --record option through a layout on a simulated sign"""
+    speed = 1
+
+    __sim = None
+    __results = None
+
+    def __init__(self, layout, speed):
+        """
+        :param layout: path to the layout file used when recording
+        :param speed: replay speed as a multiple of real time, 0 replays as fast as possible
+        """
+        self.speed = speed
+        self.__sim = SignSimulator(layout)
+        self.__sim.startup()
+
+    def run(self, path):
+        """replay the events in the recording
+
+        :param path: path to the recording file
+
+        :returns: dict of results
+        """
+        latency = []  # time from when the event should have happened until it was handled
+        processing = []  # time spent handling the event
+        counts = {MQTT_EVENT: 0, REST_EVENT: 0, HA_EVENT: 0, "ignored": 0}
+
+        start = time.perf_counter()
+        first = None
+        next_tick = None
+
+        for event in read_events(path):
+            if(first is None):
+                first = event['t']
+                next_tick = first + TICK_INTERVAL
+
+            # wait until the event is due
+            due = start
+            if(self.speed > 0):
+                due = start + (event['t'] - first) / self.speed
+                if(due > time.perf_counter()):
+                    time.sleep(due - time.perf_counter())
+
+            begin = time.perf_counter()
+            if(self.speed == 0):
+                due = begin
+
+            while(event['t'] >= next_tick):
+                self.__sim.tick([])
+                next_tick = next_tick + TICK_INTERVAL
+
+            if(self.__handle(event)):
+                counts[event['e']] = counts[event['e']] + 1
+
+                done = time.perf_counter()
+                processing.append(done - begin)
+                latency.append(done - due)
+            else:
+                counts['ignored'] = counts['ignored'] + 1
+
+        replay_time = time.perf_counter() - start
+
+        # wait for the sign writes to finish
+        self.__sim.stop()
+        total_time = time.perf_counter() - start
+
+        return {"version": constants.PROJECT_VERSION, "recording": path, "speed": self.speed,
+                "results": {"events": counts, "recorded_seconds": round(event['t'] - first, 3) if first is not None else 0,
+                            "replay_seconds": round(replay_time, 3), "total_seconds": round(total_time, 3),
+                            "latency": get_timings(latency), "processing": get_timings(processing),
+                            "sign": self.__sim.get_stats()}}
+
+    def __handle(self, event):
+        """send an event through the simulator
+
+        :returns: True if the event was for a variable in the layout
+        """
+        result = False
+
+        if(event['e'] == MQTT_EVENT):
+            # commands and other system topics aren't replayed
+            result = self.__sim.on_message(event['n'], event['p']) > 0
+        elif(event['e'] in [REST_EVENT, HA_EVENT]):
+            try:
+                self.__sim.set_payload(event['n'], event['p'])
+                result = True
+            except KeyError:
+                logging.warning(f"{event['n']} is not in the layout, skipping")
+
+        return result
+
+
+parser = argparse.ArgumentParser(description=f"{constants.PROJECT_NAME} - Replay")
+parser.add_argument('recording',
+                    help="Path to a file created with the --record option")
+parser.add_argument('-l', '--layout', default="data/layout.yaml",
+                    help="Path to yaml file containing sign text layout, default is %(default)s")
+parser.add_argument('-s', '--speed', type=float, default=1,
+                    help="Replay speed as a multiple of real time, 100 is 100x faster, 0 is as fast as possible, default is %(default)s")
+parser.add_argument('-o', '--output', required=False,
+                    help="Path to write the JSON results to, printed if missing")
+parser.add_argument('-D', '--debug', action='store_true',
+                    help='Enables logging debug mode')
+
+args = parser.parse_args()
+
+logging.basicConfig(datefmt='%m/%d %H:%M:%S',
+                    format="%(message)s",
+                    level=getattr(logging, 'DEBUG' if args.debug else 'WARNING'))
+
+replay = EventReplay(args.layout, max(args.speed, 0))
+results = json.dumps(replay.run(args.recording), indent=2)
+
+if(args.output):
+    with open(args.output, 'w') as f:
+        f.write(results)
+
+    print(colored(f"Results written to {args.output}", 'green'))
+else:
+    print(results)